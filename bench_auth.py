@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Auth dependency microbenchmark for CodeGenesis
+Times token verification alone and the full get_current_active_user chain,
+with the verified-token and authenticated-user caches on and off.
+
+Usage: python bench_auth.py [--iterations 20000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+
+def timeit(fn, iterations):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.py keeps its SQLite file relative to the working directory
+        os.chdir(workdir)
+        import app
+        app.bootstrap()
+
+        db = app.SessionLocal()
+        db.add(app.User(username="bench", email="bench@example.com", hashed_password="x"))
+        db.commit()
+        token = app.create_access_token({"sub": "bench"})
+
+        def verify():
+            app.decode_access_token(token)
+
+        def dependency():
+            payload = app.decode_access_token(token)
+            user = app.load_user(db, payload["sub"])
+            app.get_current_active_user(user)
+
+        print(f"{args.iterations} iterations per case")
+        print(f"{'case':<48} {'us/call':>9}")
+        for label, fn in (("decode_access_token", verify), ("token + user lookup + active check", dependency)):
+            for token_cache, user_cache in ((False, False), (True, False), (True, True)):
+                app.token_cache.maxsize = app.JWT_CACHE_SIZE if token_cache else 0
+                app.user_cache.maxsize = app.USER_CACHE_SIZE if user_cache else 0
+                app.token_cache.clear()
+                app.user_cache.clear()
+                if fn is verify and user_cache:
+                    continue
+                caches = "+".join(name for name, on in (("token", token_cache), ("user", user_cache)) if on)
+                print(f"{label + ' [' + (caches or 'no cache') + ']':<48} {timeit(fn, args.iterations):>9.1f}")
+        db.close()
+        app.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Comment tree benchmark for CodeGenesis
+Seeds one post with a randomly nested comment thread and compares walking it
+through the ORM replies relationship (one lazy load per comment) with
+load_comment_tree (one recursive CTE), whole and depth-limited, plus the full
+GET /posts/{id}/comments/tree endpoint.
+
+Usage: python bench_comments.py [comments ...]   (default: 50000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import func, select, text
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+AUTHORS = 200
+TOP_LEVEL_SHARE = 0.05
+
+
+def seed(app, comments):
+    random.seed(42)
+    db = app.SessionLocal()
+    authors = [app.User(username=f"bench{i}", email=f"bench{i}@example.com", hashed_password="x")
+               for i in range(AUTHORS)]
+    db.add_all(authors)
+    post = app.Post(title="Thread", content="body", author=authors[0])
+    db.add(post)
+    db.flush()
+    author_ids = [author.id for author in authors]
+
+    table = app.Comment.__table__
+    first_id = (db.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+    rows = []
+    for offset in range(comments):
+        comment_id = first_id + offset
+        # Replies go to any earlier comment, which yields depths around 2 * ln(n)
+        parent_id = None if offset == 0 or random.random() < TOP_LEVEL_SHARE else random.randrange(first_id, comment_id)
+        rows.append({"id": comment_id, "content": f"comment {offset}", "author_id": random.choice(author_ids),
+                     "post_id": post.id, "parent_id": parent_id})
+    db.execute(table.insert(), rows)
+    db.commit()
+    post_id = post.id
+    db.close()
+    return post_id
+
+
+def walk_orm(app, post_id):
+    """The old access pattern: top-level comments, then .replies at every node."""
+    db = app.SessionLocal()
+    try:
+        count = 0
+        stack = db.query(app.Comment).filter(app.Comment.post_id == post_id,
+                                             app.Comment.parent_id.is_(None)).all()
+        while stack:
+            comment = stack.pop()
+            comment.author.username
+            count += 1
+            stack.extend(comment.replies)
+        return count
+    finally:
+        db.close()
+
+
+def load_tree(app, post_id, max_depth=None):
+    db = app.SessionLocal()
+    try:
+        return app.load_comment_tree(db, post_id, max_depth=max_depth)
+    finally:
+        db.close()
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50000]
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.py keeps its SQLite file relative to the working directory
+        os.chdir(workdir)
+        import app
+        app.bootstrap()
+        from fastapi.testclient import TestClient
+
+        client = TestClient(app.app)
+        print(f"{'comments':>9} {'case':<32} {'ms':>10}")
+        for comments in sizes:
+            post_id = seed(app, comments)
+            depth = app.SessionLocal().execute(text(
+                "WITH RECURSIVE t(id, d) AS (SELECT id, 0 FROM comments WHERE post_id = :p AND parent_id IS NULL "
+                "UNION ALL SELECT c.id, t.d + 1 FROM comments c JOIN t ON c.parent_id = t.id) SELECT max(d) FROM t"
+            ), {"p": post_id}).scalar()
+            cases = [
+                ("ORM walk (lazy replies)", lambda: walk_orm(app, post_id)),
+                ("recursive CTE, whole tree", lambda: load_tree(app, post_id)),
+                ("recursive CTE, max_depth=2", lambda: load_tree(app, post_id, max_depth=2)),
+                ("GET .../comments/tree", lambda: client.get(f"/posts/{post_id}/comments/tree").raise_for_status()),
+            ]
+            print(f"{comments:>9} {'(max depth ' + str(depth) + ')':<32}")
+            for label, fn in cases:
+                print(f"{comments:>9} {label:<32} {timed(fn):>10.1f}")
+        app.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for CodeGenesis
+Serves the API with uvicorn in thread-pool mode (sync engine) and in async
+engine mode, then measures GET /posts latency under many parallel clients.
+
+Usage: python bench_concurrency.py [--clients 200] [--requests 4000] [--url URL ...]
+
+To compare with another revision (e.g. one from before db_endpoint), start
+it with uvicorn yourself and pass its base URL with --url. Tail latency
+under load depends on the thread pool and CPU count as much as on the
+mode; measure before assuming either one is faster.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+MODES = {"threadpool": "false", "async": "true"}
+SEED_POSTS = 500
+
+
+def seed(workdir):
+    # app.py keeps its SQLite file relative to the working directory
+    os.chdir(workdir)
+    from app import SessionLocal, User, Post, Tag, bootstrap, recount_counters
+
+    bootstrap()
+
+    db = SessionLocal()
+    author = User(username="bench", email="bench@example.com", hashed_password="x", full_name="Bench")
+    tags = [Tag(name=f"bench{i}") for i in range(5)]
+    db.add_all(Post(title=f"Post {i}", content="body " * 200, author=author, tags=tags[i % 5:i % 5 + 2])
+               for i in range(SEED_POSTS))
+    db.flush()
+    recount_counters(db)
+    db.commit()
+    db.close()
+
+
+def start_server(workdir, mode, port):
+    env = dict(os.environ, ASYNC_DATABASE=MODES[mode])
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", REPO_DIR,
+         "--port", str(port), "--log-level", "warning", "--timeout-keep-alive", "120"],
+        cwd=workdir, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if httpx.get(url + "/").status_code == 200:
+                return process, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def load(url, clients, requests):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.get("/posts", params={"limit": 20})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "rps": len(latencies) / elapsed,
+        "errors": errors,
+    }
+
+
+def report(label, stats):
+    print(f"{label:<24} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f} "
+          f"{stats['rps']:>9.0f} {stats['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--url", action="append", default=[], help="benchmark an already running server")
+    args = parser.parse_args()
+
+    print(f"{args.clients} parallel clients, {args.requests} requests of GET /posts?limit=20")
+    print(f"{'server':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+    for url in args.url:
+        report(url, asyncio.run(load(url, args.clients, args.requests)))
+    if args.url:
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seed(workdir)
+        for port, mode in enumerate(MODES, start=8765):
+            process, url = start_server(workdir, mode, port)
+            try:
+                # Warm up connections and caches before measuring
+                asyncio.run(load(url, args.clients, args.clients))
+                report(mode, asyncio.run(load(url, args.clients, args.requests)))
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
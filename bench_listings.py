@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Large listing benchmark for CodeGenesis
+Seeds one post with a long flat comment thread, serves the API with uvicorn
+and fetches the whole thread as one page (?limit=N) and as a streamed array
+(?stream=true), with and without gzip. Reports the server's peak memory
+growth, time to the first byte and to the last, and bytes on the wire.
+
+Usage: python bench_listings.py [--comments 100000]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+
+def seed(workdir, comments):
+    # app.py keeps its SQLite file relative to the working directory
+    os.chdir(workdir)
+    import app
+
+    app.bootstrap()
+    db = app.SessionLocal()
+    author = app.User(username="bench", email="bench@example.com", hashed_password="x", full_name="Bench")
+    post = app.Post(title="Thread", content="body", author=author)
+    db.add(post)
+    db.flush()
+    db.execute(app.Comment.__table__.insert(), [
+        {"content": f"comment {i} " + "words " * 20, "author_id": author.id, "post_id": post.id}
+        for i in range(comments)
+    ])
+    db.commit()
+    post_id = post.id
+    db.close()
+    app.engine.dispose()
+    return post_id
+
+
+def memory_kib(pid, field):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def start_server(workdir, port, max_page_size):
+    # Lift the page size cap so the whole thread can be requested as one page
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", REPO_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=dict(os.environ, MAX_PAGE_SIZE=str(max_page_size)),
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if httpx.get(url + "/").status_code == 200:
+                return process, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("server did not start")
+
+
+def fetch(url, path, encoding):
+    # A fresh server per run, so its peak RSS belongs to this request alone
+    with httpx.Client(base_url=url, timeout=300) as client:
+        client.get(path.split("?")[0] + "?limit=1")
+        start = time.perf_counter()
+        first_byte = None
+        wire = 0
+        with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+            response.raise_for_status()
+            for chunk in response.iter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                wire += len(chunk)
+        return first_byte, time.perf_counter() - start, wire
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--comments", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        post_id = seed(workdir, args.comments)
+        print(f"one post with {args.comments} comments")
+        print(f"{'request':<34} {'peak MiB':>9} {'first ms':>9} {'total ms':>9} {'wire KiB':>9}")
+        runs = (("one page", f"/posts/{post_id}/comments?limit={args.comments}", "identity"),
+                ("one page, gzip", f"/posts/{post_id}/comments?limit={args.comments}", "gzip"),
+                ("streamed", f"/posts/{post_id}/comments?stream=true", "identity"),
+                ("streamed, gzip", f"/posts/{post_id}/comments?stream=true", "gzip"))
+        for port, (label, path, encoding) in enumerate(runs, start=8785):
+            process, url = start_server(workdir, port, args.comments)
+            try:
+                baseline = memory_kib(process.pid, "VmRSS")
+                first_byte, total, wire = fetch(url, path, encoding)
+                peak = memory_kib(process.pid, "VmHWM") - baseline
+            finally:
+                process.terminate()
+                process.wait()
+            print(f"{label:<34} {peak / 1024:>9.1f} {first_byte * 1000:>9.0f} {total * 1000:>9.0f} "
+                  f"{wire / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
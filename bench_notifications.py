@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Notification pipeline benchmark for CodeGenesis
+Queues a backlog of like/comment/follow events and times how long the
+notification worker takes to coalesce and bulk-insert them.
+
+Usage: python bench_notifications.py [events ...]   (default: 100000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+USERS = 2000
+POSTS = 5000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000]
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.py keeps its SQLite file relative to the working directory
+        os.chdir(workdir)
+        import app
+        app.bootstrap()
+        from notifications import NotificationEvent
+
+        db = app.SessionLocal()
+        users = [app.User(username=f"bench{i}", email=f"bench{i}@example.com", hashed_password="x")
+                 for i in range(USERS)]
+        db.add_all(users)
+        db.flush()
+        posts = [app.Post(title=f"Post {i}", content="body", author_id=random.choice(users).id)
+                 for i in range(POSTS)]
+        db.add_all(posts)
+        db.commit()
+        users = [(user.id, user.username) for user in users]
+        posts = [(post.id, post.title, post.author_id) for post in posts]
+        db.close()
+
+        random.seed(42)
+        print(f"{'events':>9} {'rows':>9} {'enqueue ms':>11} {'drain ms':>9} {'events/s':>10}")
+        for size in sizes:
+            queue = app.notification_queue
+            start = time.perf_counter()
+            for _ in range(size):
+                actor_id, actor_name = random.choice(users)
+                kind = random.choice(("like", "like", "comment", "follow"))
+                if kind == "follow":
+                    event = NotificationEvent(random.choice(users)[0], kind, actor_id, actor_name, None, None)
+                else:
+                    post_id, title, author_id = random.choice(posts)
+                    event = NotificationEvent(author_id, kind, actor_id, actor_name, post_id, title)
+                queue.emit(event)
+            enqueued = time.perf_counter()
+            rows = queue.flush()
+            drained = time.perf_counter()
+            print(f"{size:>9} {rows:>9} {(enqueued - start) * 1000:>11.1f} {(drained - enqueued) * 1000:>9.1f} "
+                  f"{size / (drained - enqueued):>10.0f}")
+        app.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
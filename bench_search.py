@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Search latency benchmark for CodeGenesis
+Compares the old LIKE '%...%' scan with the FTS5 and in-memory search indexes.
+
+Usage: python bench_search.py [--engines like,fts5,python] [SIZE ...]
+       (default sizes: 10000 100000 1000000)
+
+Note that LIKE with LIMIT stops at the first ten matches in table order, so
+for very common words it can look fast while returning unranked results;
+rare and multi-word queries show the cost of the full scan. The indexes
+always rank every match.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app import Post
+from search import FTS5SearchIndex, InvertedIndex
+
+WORDS_PER_POST = 40
+VOCABULARY_SIZE = 20000
+REPEATS = 20
+
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def populate(engine, size, vocabulary, rng):
+    # Zipf-like weights: a few very common words and a long tail of rare ones
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    Post.__table__.create(engine)
+    with engine.begin() as conn:
+        batch = []
+        for post_id in range(1, size + 1):
+            words = rng.choices(vocabulary, cum_weights=cum_weights, k=WORDS_PER_POST)
+            batch.append({
+                "id": post_id, "title": " ".join(words[:6]), "content": " ".join(words),
+                "author_id": 1, "is_published": True,
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Post.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Post.__table__), batch)
+
+
+def timed(fn, repeats=REPEATS):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def like_search(engine, term):
+    # The query get_posts used to run for ?search=
+    with Session(engine) as db:
+        db.execute(
+            select(Post.id).where(Post.is_published == True)
+            .where(Post.title.contains(term) | Post.content.contains(term))
+            .limit(10)
+        ).all()
+
+
+def run(size, engines, vocabulary):
+    rng = random.Random(size)
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        start = time.perf_counter()
+        populate(engine, size, vocabulary, rng)
+        print(f"\n{size:,} posts (generated in {time.perf_counter() - start:.1f}s)")
+
+        queries = {
+            "common word": vocabulary[0],
+            "rare word": vocabulary[-1],
+            "two words": f"{vocabulary[3]} {vocabulary[40]}",
+            "prefix": vocabulary[10][:3] + "*",
+        }
+
+        indexes = {}
+        if "fts5" in engines:
+            start = time.perf_counter()
+            indexes["fts5"] = FTS5SearchIndex(engine)
+            indexes["fts5"].install()
+            print(f"  fts5 index built in {time.perf_counter() - start:.1f}s")
+        if "python" in engines:
+            start = time.perf_counter()
+            indexes["python"] = InvertedIndex(engine)
+            indexes["python"].install()
+            print(f"  python index built in {time.perf_counter() - start:.1f}s")
+
+        print(f"  {'query':<12} {'engine':<7} {'median ms':>10} {'p95 ms':>10}")
+        for label, query in queries.items():
+            if "like" in engines:
+                # LIKE has no prefix syntax; a substring match is the closest equivalent
+                term = query.rstrip("*")
+                median, p95 = timed(lambda: like_search(engine, term), repeats=5 if size > 100000 else REPEATS)
+                print(f"  {label:<12} {'like':<7} {median:>10.2f} {p95:>10.2f}")
+            for name, index in indexes.items():
+                median, p95 = timed(lambda: index.search(query, limit=10))
+                print(f"  {label:<12} {name:<7} {median:>10.2f} {p95:>10.2f}")
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=[10000, 100000, 1000000])
+    parser.add_argument("--engines", default="like,fts5,python",
+                        help="comma-separated subset of like, fts5, python")
+    args = parser.parse_args()
+    engines = set(args.engines.split(","))
+    vocabulary = make_vocabulary(random.Random(0))
+    for size in args.sizes:
+        run(size, engines, vocabulary)
+
+
+if __name__ == "__main__":
+    main()
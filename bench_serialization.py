@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Response serialization benchmark for CodeGenesis
+Times turning one page of already-loaded posts into JSON bytes: the old way
+(a Pydantic model per post and author, validated again by the route's
+response_model) against the dict mapping and orjson rendering the API uses.
+
+Usage: python bench_serialization.py [--posts 100] [--authors 20] [--repeats 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+
+def seed(app, posts, authors):
+    db = app.SessionLocal()
+    users = [app.User(username=f"bench{i}", email=f"bench{i}@example.com", hashed_password="x",
+                      full_name=f"Bench {i}", bio="Writes benchmarks") for i in range(authors)]
+    tags = [app.Tag(name=f"tag{i}") for i in range(10)]
+    db.add_all(app.Post(title=f"Post {i}", content="body " * 100, author=users[i % authors],
+                        tags=tags[i % 8:i % 8 + 3]) for i in range(posts))
+    db.flush()
+    app.recount_counters(db)
+    db.commit()
+    db.close()
+
+
+def pydantic_page(app, posts, response_model):
+    """What the handlers did before: build models by hand, then FastAPI re-validates them."""
+    models = [app.PostResponse(
+        id=post.id, title=post.title, content=post.content, author_id=post.author_id,
+        author=app.UserResponse(
+            id=post.author.id, username=post.author.username, email=post.author.email,
+            full_name=post.author.full_name, bio=post.author.bio, avatar_url=post.author.avatar_url,
+            is_active=post.author.is_active, is_verified=post.author.is_verified, role=post.author.role,
+            created_at=post.author.created_at, followers_count=post.author.followers_count,
+            following_count=post.author.following_count, posts_count=post.author.posts_count,
+        ),
+        is_published=post.is_published, is_featured=post.is_featured, view_count=post.view_count,
+        created_at=post.created_at, updated_at=post.updated_at,
+        tags=[app.TagResponse(id=tag.id, name=tag.name, description=tag.description, color=tag.color,
+                              created_at=tag.created_at) for tag in post.tags],
+        comments_count=post.comments_count, likes_count=post.likes_count, is_liked_by_user=False,
+    ) for post in posts]
+    return response_model.dump_json(response_model.validate_python(models, from_attributes=True))
+
+
+def orjson_page(app, posts):
+    from serializers import dumps
+    return dumps(app.build_post_responses(None, posts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--authors", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.py keeps its SQLite file relative to the working directory
+        os.chdir(workdir)
+        import app
+        app.bootstrap()
+        response_model = TypeAdapter(List[app.PostResponse])
+
+        seed(app, args.posts, args.authors)
+        db = app.SessionLocal()
+        posts = app.with_feed_options(db.query(app.Post)).order_by(app.Post.id).limit(args.posts).all()
+
+        print(f"{len(posts)} posts by {args.authors} authors, 3 tags each; {args.repeats} repeats")
+        print(f"{'serializer':<36} {'ms/page':>9} {'bytes':>8}")
+        for label, render in (("pydantic models + response_model",
+                               lambda: pydantic_page(app, posts, response_model)),
+                              ("row dicts + orjson", lambda: orjson_page(app, posts))):
+            body = render()
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                render()
+            elapsed = (time.perf_counter() - start) / args.repeats
+            print(f"{label:<36} {elapsed * 1000:>9.2f} {len(body):>8}")
+        db.close()
+        app.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Notification stream load test for CodeGenesis
+Starts one uvicorn worker, opens many idle Server-Sent Events connections to
+GET /notifications/stream, and reports the worker's memory before and after,
+heartbeat delivery, and end-to-end delivery of notifications to live streams.
+
+Usage: python bench_streams.py [--connections 10000] [--users 1000] [--hold 20] [--push 200]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+PORT = 8791
+HEARTBEAT_SECONDS = 5
+
+
+def seed(workdir, users):
+    # app.py keeps its SQLite file relative to the working directory
+    os.chdir(workdir)
+    from app import SessionLocal, User, Post, bootstrap, create_access_token, recount_counters
+
+    bootstrap()
+
+    db = SessionLocal()
+    db.add_all(User(username=f"reader{i}", email=f"reader{i}@example.com", hashed_password="x")
+               for i in range(users))
+    db.add(User(username="actor", email="actor@example.com", hashed_password="x"))
+    db.flush()
+    readers = db.query(User).filter(User.username.like("reader%")).order_by(User.id).all()
+    db.add_all(Post(title=f"Post {i}", content="body", author_id=reader.id) for i, reader in enumerate(readers))
+    db.flush()
+    recount_counters(db)
+    db.commit()
+    post_ids = [post_id for (post_id,) in db.query(Post.id).order_by(Post.id)]
+    db.close()
+    tokens = [create_access_token({"sub": f"reader{i}"}, timedelta(hours=1)) for i in range(users)]
+    return tokens, create_access_token({"sub": "actor"}, timedelta(hours=1)), post_ids
+
+
+def rss_kib(pid):
+    with open(f"/proc/{pid}/status") as status:
+        return int(re.search(r"VmRSS:\s+(\d+)", status.read()).group(1))
+
+
+class Stream:
+    """A raw SSE connection; cheaper per connection than a full HTTP client."""
+
+    def __init__(self):
+        self.heartbeats = 0
+        self.notifications = 0
+        self.writer = None
+
+    async def open(self, token):
+        reader, self.writer = await asyncio.open_connection("127.0.0.1", PORT)
+        self.writer.write(
+            f"GET /notifications/stream?token={token} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Accept: text/event-stream\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        status = await reader.readline()
+        if b" 200 " not in status:
+            raise RuntimeError(status.decode().strip())
+        return reader
+
+    async def consume(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b": ping"):
+                self.heartbeats += 1
+            elif line.startswith(b"event: notification"):
+                self.notifications += 1
+
+
+async def run(args, tokens, actor_token, post_ids, pid):
+    baseline = rss_kib(pid)
+    # Stream i belongs to reader i % users
+    streams = [Stream() for _ in range(args.connections)]
+    consumers = []
+    start = time.perf_counter()
+    # Connect in waves so the listen backlog never overflows
+    for wave in range(0, args.connections, 500):
+        readers = await asyncio.gather(*(
+            stream.open(tokens[i % len(tokens)]) for i, stream in enumerate(streams[wave:wave + 500], start=wave)
+        ))
+        consumers += [asyncio.create_task(stream.consume(reader))
+                      for stream, reader in zip(streams[wave:wave + 500], readers)]
+    connected = time.perf_counter() - start
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=60) as client:
+        metrics = (await client.get("/metrics")).json()["streams"]
+        held = rss_kib(pid)
+        print(f"connections open        {metrics['connections']} (in {connected:.1f}s)")
+        print(f"worker RSS              {baseline / 1024:.1f} MiB idle -> {held / 1024:.1f} MiB "
+              f"({(held - baseline) / args.connections:.1f} KiB per connection)")
+
+        for stream in streams:
+            stream.heartbeats = 0
+        await asyncio.sleep(args.hold)
+        silent = sum(1 for s in streams if not s.heartbeats)
+        print(f"heartbeats received     {sum(s.heartbeats for s in streams)} over {args.hold}s "
+              f"(every {HEARTBEAT_SECONDS}s per connection; {silent} connections got none)")
+
+        # Like one post of each of the first --push readers, one request at a time
+        # (SQLite has a single writer); each of their streams gets one notification
+        headers = {"Authorization": f"Bearer {actor_token}"}
+        pushed = min(args.push, len(post_ids))
+        start = time.perf_counter()
+        for post_id in post_ids[:pushed]:
+            (await client.post(f"/posts/{post_id}/like", headers=headers)).raise_for_status()
+        expected = sum(1 for i in range(args.connections) if i % len(tokens) < pushed)
+        while sum(s.notifications for s in streams) < expected and time.perf_counter() - start < 30:
+            await asyncio.sleep(0.05)
+        delivered = sum(s.notifications for s in streams)
+        print(f"notifications delivered {delivered}/{expected} in {time.perf_counter() - start:.1f}s")
+        print(f"worker RSS after push   {rss_kib(pid) / 1024:.1f} MiB")
+
+    for stream in streams:
+        stream.writer.close()
+    for consumer in consumers:
+        consumer.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--hold", type=float, default=20, help="seconds to hold the idle connections")
+    parser.add_argument("--push", type=int, default=200, help="readers to send a notification to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tokens, actor_token, post_ids = seed(workdir, args.users)
+        env = dict(os.environ, STREAM_HEARTBEAT_SECONDS=str(HEARTBEAT_SECONDS))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", REPO_DIR, "--port", str(PORT),
+             "--log-level", "warning", "--backlog", "1024"],
+            cwd=workdir, env=env,
+        )
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"http://127.0.0.1:{PORT}/")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            asyncio.run(run(args, tokens, actor_token, post_ids, server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Trending ranking benchmark for CodeGenesis
+Seeds posts spread over the trending window with random likes, comments and
+views, then times: scoring and sorting every post on each request (what a
+hotness ORDER BY costs), a full ranking rebuild with and without NumPy, an
+incremental refresh after a burst of likes, and GET /posts/trending.
+
+Usage: python bench_trending.py [--posts 200000] [--touched 100] [--repeats 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(REPO_DIR)
+
+
+def seed(app, posts):
+    random.seed(42)
+    db = app.SessionLocal()
+    author = app.User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(author)
+    db.flush()
+    now = datetime.utcnow()
+    window = app.TRENDING_WINDOW_DAYS * 86400
+    db.execute(app.Post.__table__.insert(), [
+        {"title": f"Post {i}", "content": "body", "author_id": author.id,
+         "created_at": now - timedelta(seconds=random.uniform(0, window)),
+         "likes_count": int(random.paretovariate(1.5)) - 1, "comments_count": int(random.paretovariate(2)) - 1,
+         "view_count": int(random.paretovariate(1.2) * 10), "is_featured": random.random() < 0.01}
+        for i in range(posts)
+    ])
+    db.commit()
+    db.close()
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--touched", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.py keeps its SQLite file relative to the working directory
+        os.chdir(workdir)
+        import app
+        import ranking
+        from fastapi.testclient import TestClient
+
+        app.bootstrap()
+        seed(app, args.posts)
+        ranker = app.trending
+        numpy_module = ranking.numpy
+
+        def scan_and_sort():
+            rows = [row for batch in app.load_trending_rows() for row in batch]
+            scores = ranker.score(rows)
+            return sorted(zip(scores, (row[0] for row in rows)), reverse=True)[:20]
+
+        print(f"{args.posts} posts in a {app.TRENDING_WINDOW_DAYS:g}-day window")
+        print(f"{'operation':<44} {'ms':>9}")
+        print(f"{'score + sort every post (per request)':<44} {timed(scan_and_sort, 3):>9.1f}")
+        ranking.numpy = None
+        print(f"{'rebuild, plain Python':<44} {timed(ranker.rebuild, 3):>9.1f}")
+        python_order = ranker.page(0, 1000)
+        if numpy_module is not None:
+            ranking.numpy = numpy_module
+            print(f"{'rebuild, NumPy':<44} {timed(ranker.rebuild, 3):>9.1f}")
+            assert ranker.page(0, 1000) == python_order, "NumPy and plain Python rankings differ"
+        else:
+            print(f"{'rebuild, NumPy':<44} {'(not installed)':>9}")
+
+        random.seed(7)
+        db = app.SessionLocal()
+        touched = random.sample(range(1, args.posts + 1), args.touched)
+        table = app.Post.__table__
+        db.execute(table.update().where(table.c.id.in_(touched)).values(likes_count=table.c.likes_count + 50))
+        db.commit()
+        db.close()
+        ranker.touch(touched)
+        start = time.perf_counter()
+        ranker.refresh()
+        label = f"refresh after {args.touched} posts were liked"
+        print(f"{label:<44} {(time.perf_counter() - start) * 1000:>9.1f}")
+
+        client = TestClient(app.app)
+        for url in ("/posts/trending?limit=20", "/posts/trending?limit=20&view=summary",
+                    "/posts/trending?limit=20&offset=100000"):
+            assert client.get(url).status_code == 200
+            print(f"{'GET ' + url.split('?')[1]:<44} {timed(lambda: client.get(url), args.repeats):>9.2f}")
+        app.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+In-process pub/sub for pushing messages to streaming connections.
+
+Each connection subscribes under a key (a user id) and gets a bounded queue
+on its own event loop. Publishers may run on any thread: delivery is handed
+to the subscriber's loop with call_soon_threadsafe, one hop per loop and
+batch. A subscriber whose queue is full is marked as overflowed and gets no
+further messages; the connection should tell its client to resync and close,
+so one slow reader never holds memory for everyone else.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+class Subscription:
+    def __init__(self, key: Hashable, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.key = key
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[str]:
+        """The next message, or None if nothing arrived within ``timeout``."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    def __init__(self, queue_size: int = 64):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[Hashable, Set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.overflowed = 0
+
+    def subscribe(self, key: Hashable) -> Subscription:
+        """Subscribe the calling event loop to messages for ``key``."""
+        subscription = Subscription(key, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.key]
+
+    def has_subscribers(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._subscriptions
+
+    def publish(self, key: Hashable, message: str):
+        self.publish_many([(key, message)])
+
+    def publish_many(self, messages: Iterable[Tuple[Hashable, str]]):
+        """Deliver (key, message) pairs; safe to call from any thread."""
+        by_loop: Dict[asyncio.AbstractEventLoop, List[Tuple[Subscription, str]]] = defaultdict(list)
+        with self._lock:
+            for key, message in messages:
+                self.published += 1
+                for subscription in self._subscriptions.get(key, ()):
+                    by_loop[subscription.loop].append((subscription, message))
+        for loop, deliveries in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, deliveries)
+            except RuntimeError:
+                # The loop has shut down; its connections are gone
+                pass
+
+    def _deliver(self, deliveries: List[Tuple[Subscription, str]]):
+        delivered = overflowed = 0
+        for subscription, message in deliveries:
+            if subscription.overflowed:
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                overflowed += 1
+                # Wake the reader so it notices and closes the stream
+                subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+        with self._lock:
+            self.delivered += delivered
+            self.overflowed += overflowed
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "connections": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+                "keys": len(self._subscriptions),
+                "published": self.published,
+                "delivered": self.delivered,
+                "overflowed": self.overflowed,
+            }
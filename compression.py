@@ -0,0 +1,143 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+CompressionMiddleware is a plain ASGI middleware. Brotli is used when the
+optional ``brotli`` package is installed and the client accepts it,
+otherwise gzip. A response sent in one piece is compressed only if it is at
+least ``minimum_size`` bytes. A streamed response has no known size and is
+compressed as it goes, flushing after every chunk so clients can parse the
+start of a long JSON array while the rest is still being read.
+
+Server-sent events are never compressed: the stream must reach the browser
+event by event, not when a compressor decides to emit a block.
+"""
+
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SKIPPED_MEDIA_TYPES = (b"text/event-stream",)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        codings[coding.strip().lower()] = quality
+    return codings
+
+
+def choose_encoding(header: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    codings = parse_accept_encoding(header)
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+    qualities = {coding: codings.get(coding, codings.get("*", 0.0)) for coding in candidates}
+    best = max(candidates, key=lambda coding: qualities[coding])
+    return best if qualities[best] > 0 else None
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits 31: gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH if flush else zlib.Z_NO_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + self._compressor.flush() if flush else out
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, encoding: str):
+        return _Brotli(self.brotli_quality) if encoding == "br" else _Gzip(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message["headers"])
+                content_type = headers.get(b"content-type", b"")
+                if (b"content-encoding" in headers or message["status"] in (204, 304)
+                        or content_type.startswith(SKIPPED_MEDIA_TYPES)):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            if passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    # Too small to be worth it; send as is
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                compressor = self._compressor(encoding)
+                await send({**start, "headers": _encoded_headers(start["headers"], encoding)})
+            data = compressor.compress(body, flush=True) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _encoded_headers(headers, encoding: str):
+    encoded = []
+    vary = []
+    for name, value in headers:
+        lowered = name.lower()
+        if lowered == b"content-length":
+            continue
+        if lowered == b"etag" and not value.startswith(b"W/"):
+            # The bytes differ from the identity response the tag was computed on
+            value = b"W/" + value
+        if lowered == b"vary":
+            vary.append(value)
+            continue
+        encoded.append((name, value))
+    vary = b", ".join(vary + [b"Accept-Encoding"])
+    return encoded + [(b"content-encoding", encoding.encode("latin-1")), (b"vary", vary)]
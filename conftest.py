@@ -0,0 +1,9 @@
+import pytest
+
+import app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    # Importing app does no I/O; migrate the test database once per run
+    app.bootstrap()
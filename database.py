@@ -0,0 +1,160 @@
+"""
+Database access helpers that keep blocking ORM work off the event loop.
+
+Endpoint bodies are written once against a regular SQLAlchemy Session.
+``db_endpoint`` runs them either in the thread pool (sync engine) or inside
+``AsyncSession.run_sync`` on an async driver such as aiosqlite or asyncpg,
+depending on which kind of session ``get_db`` handed out.
+
+Only the queries of a ``run_sync`` body are awaited; the body itself runs
+on the event loop's thread. Anything else in it that blocks (a query on a
+sync engine, a network round trip) must go through ``run_blocking``, which
+hands it to the thread pool in that mode.
+
+``create_db_engine`` builds the engines behind those sessions: a pooled
+read-write engine, and optionally a read-only one for GET requests. SQLite
+connections are tuned by a named profile of PRAGMAs.
+
+``stream_query`` serves listings too long to hold in memory: it reads rows
+through a server-side cursor in batches, in a session of its own that lives
+as long as the response body is being sent.
+"""
+
+import inspect
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from starlette.concurrency import run_in_threadpool
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+# PRAGMAs run on every new SQLite connection
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal, synchronous=FULL
+    "default": {},
+    # Concurrent serving: readers never wait for the writer, writers queue for
+    # the lock instead of failing, and hot pages stay in memory
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def create_db_engine(url: str, *, read_only: bool = False, asyncio: bool = False,
+                     sqlite_profile: str = "production", pool_size: int = 5, max_overflow: int = 10):
+    """A pooled engine for ``url``; read-only engines refuse writes at the database.
+
+    SQLite connections get the PRAGMAs of ``sqlite_profile`` (plus query_only
+    when read-only); PostgreSQL read-only transactions run SET TRANSACTION
+    READ ONLY.
+    """
+    database = make_url(url)
+    options = {}
+    if database.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if database.database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection; keep SQLAlchemy's pool
+            return (create_async_engine if asyncio else create_engine)(url, **options)
+    options.update(pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+    engine = (create_async_engine if asyncio else create_engine)(url, **options)
+    sync_engine = engine.sync_engine if asyncio else engine
+
+    if database.get_backend_name() == "sqlite":
+        pragmas = dict(SQLITE_PROFILES[sqlite_profile])
+        if read_only:
+            pragmas["query_only"] = "ON"
+
+        @event.listens_for(sync_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+            cursor.close()
+    elif read_only and database.get_backend_name() == "postgresql":
+        @event.listens_for(sync_engine, "begin")
+        def begin_read_only(conn):
+            conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    """Swap a sync database URL's driver for its asyncio counterpart."""
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for database URL scheme {scheme!r}")
+    return f"{ASYNC_DRIVERS[backend]}{sep}{rest}"
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """Call ``fn(session, *args, **kwargs)`` without blocking the event loop."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Call blocking ``fn`` from code that ``run_db`` runs.
+
+    Inside ``AsyncSession.run_sync`` that code is on the event loop's thread,
+    so ``fn`` runs in the thread pool while the loop waits for it; anywhere
+    else (a thread pool worker, a script) it is simply called.
+    """
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
+
+
+def stream_query(sessions, statement, render, batch_size: int = 500):
+    """Iterate ``render(session, rows)`` over ``statement``'s ORM rows, a batch at a time.
+
+    ``sessions`` is a session factory, sync or async; the result is a
+    matching sync or async iterator. Rows come from a server-side cursor, so
+    only one batch is in memory at once. ``render`` always runs against a
+    regular Session, so it may lazy-load in either mode.
+    """
+    statement = statement.execution_options(yield_per=batch_size)
+    if isinstance(sessions, async_sessionmaker):
+        async def batches():
+            async with sessions() as db:
+                result = await db.stream_scalars(statement)
+                async for rows in result.partitions():
+                    yield await db.run_sync(render, rows)
+        return batches()
+
+    def batches():
+        with sessions() as db:
+            for rows in db.scalars(statement).partitions():
+                yield render(db, rows)
+    return batches()
+
+
+def db_endpoint(fn):
+    """Turn a synchronous endpoint or dependency taking ``db`` into a non-blocking one.
+
+    The wrapper keeps the original signature so FastAPI still resolves the
+    same parameters and dependencies.
+    """
+    async def wrapper(*args, **kwargs):
+        db = kwargs.pop("db")
+        return await run_db(db, lambda session: fn(*args, db=session, **kwargs))
+
+    wrapper.__signature__ = inspect.signature(fn)
+    wrapper.__name__ = fn.__name__
+    wrapper.__qualname__ = fn.__qualname__
+    wrapper.__doc__ = fn.__doc__
+    wrapper.__module__ = fn.__module__
+    return wrapper
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for CodeGenesis
+Usage: python manage.py <command>
+"""
+
+import argparse
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import (
+    SessionLocal, User, migrate_schema, migrator, prune_read_notifications, rebuild_timelines,
+    recount_counters, seed_default_tags
+)
+
+def recount(args):
+    migrate_schema()
+    db = SessionLocal()
+    try:
+        recount_counters(db)
+        db.commit()
+        print("✅ Recomputed like, comment, follower, following and post counters")
+    finally:
+        db.close()
+
+def migrate(args):
+    if not args.status:
+        for migration in migrate_schema():
+            print(f"✅ Applied migration {migration.version}: {migration.description}")
+    pending = migrator.pending()
+    print(f"Schema version {migrator.current()} of {migrator.head}")
+    for migration in pending:
+        print(f"  pending {migration.version}: {migration.description}")
+
+def seed(args):
+    migrate_schema()
+    db = SessionLocal()
+    try:
+        added = seed_default_tags(db)
+        db.commit()
+        print(f"✅ Added {added} default tags")
+    finally:
+        db.close()
+
+def rebuild_timeline(args):
+    migrate_schema()
+    db = SessionLocal()
+    try:
+        user_id = None
+        if args.user:
+            user = db.query(User).filter(User.username == args.user).first()
+            if user is None:
+                sys.exit(f"❌ No such user: {args.user}")
+            user_id = user.id
+        rebuild_timelines(db, user_id)
+        db.commit()
+        print(f"✅ Rebuilt home timelines for {args.user or 'all users'}")
+    finally:
+        db.close()
+
+def prune_notifications(args):
+    migrate_schema()
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=args.days)
+        deleted = prune_read_notifications(db, cutoff, batch_size=args.batch_size)
+        print(f"✅ Deleted {deleted} read notifications older than {args.days} days")
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="CodeGenesis maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "recount", help="Repair denormalized counter columns from the source tables"
+    ).set_defaults(func=recount)
+
+    migrations = commands.add_parser(
+        "migrate", help="Apply pending schema migrations (indexes are built online)"
+    )
+    migrations.add_argument("--status", action="store_true", help="only list applied and pending versions")
+    migrations.set_defaults(func=migrate)
+
+    commands.add_parser(
+        "seed", help="Create the default tags; safe to run more than once"
+    ).set_defaults(func=seed)
+
+    timelines = commands.add_parser(
+        "rebuild-timelines", help="Recreate home timelines from the follow graph"
+    )
+    timelines.add_argument("--user", help="only rebuild this user's timeline")
+    timelines.set_defaults(func=rebuild_timeline)
+
+    prune = commands.add_parser(
+        "prune-notifications", help="Delete old read notifications in small batches"
+    )
+    prune.add_argument("--days", type=int, default=30, help="keep read notifications newer than this")
+    prune.add_argument("--batch-size", type=int, default=1000)
+    prune.set_defaults(func=prune_notifications)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
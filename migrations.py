@@ -0,0 +1,162 @@
+"""
+Versioned schema migrations.
+
+Migrations are functions registered under increasing version numbers. The
+``schema_version`` table records the versions a database has applied, and
+``upgrade`` runs the missing ones in order. Each transactional migration runs
+in its own transaction together with its version row, so a failure leaves the
+database at the last version that completed.
+
+Non-transactional migrations get an autocommit connection. Use them for index
+builds: PostgreSQL can then build indexes CONCURRENTLY, and SQLite commits
+after each index, so writers are only blocked while one index builds.
+
+Every worker migrates at startup, so schema changes are serialized by
+``Migrator.lock``: an advisory lock on PostgreSQL, an flock on a file next
+to the database on SQLite. Whoever waited re-reads the version and finds
+nothing left to do.
+"""
+
+import logging
+import os
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple("Migration", ["version", "description", "upgrade", "transactional"])
+
+# Key of the PostgreSQL advisory lock held while migrating
+ADVISORY_LOCK_KEY = 0x636f6465
+
+
+def create_index_online(conn, index):
+    """Create ``index`` if it is missing, without blocking writes where the database allows."""
+    if conn.dialect.name != "postgresql":
+        index.create(bind=conn, checkfirst=True)
+        return
+    # The Index belongs to shared metadata; CONCURRENTLY must not leak into
+    # a later create_all, which runs inside a transaction
+    options = index.dialect_options["postgresql"]
+    concurrently = options["concurrently"]
+    options["concurrently"] = True
+    try:
+        index.create(bind=conn, checkfirst=True)
+    finally:
+        options["concurrently"] = concurrently
+
+
+class Migrator:
+    def __init__(self, engine, table_name: str = "schema_version"):
+        self.engine = engine
+        self.migrations: List[Migration] = []
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self.version_table = Table(
+            table_name, MetaData(),
+            Column("version", Integer, primary_key=True),
+            Column("description", String, nullable=False),
+            Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+        )
+
+    def migration(self, version: int, description: str, transactional: bool = True):
+        """Register the decorated ``fn(connection)`` as schema version ``version``."""
+        def register(fn: Callable):
+            if self.migrations and version <= self.migrations[-1].version:
+                raise ValueError(f"Migration {version} must come after {self.migrations[-1].version}")
+            self.migrations.append(Migration(version, description, fn, transactional))
+            return fn
+        return register
+
+    @property
+    def head(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    @contextmanager
+    def lock(self):
+        """Hold the schema lock; re-entrant within a thread."""
+        with self._thread_lock:
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    with self._database_lock():
+                        yield
+                else:
+                    yield
+            finally:
+                self._lock_depth -= 1
+
+    @contextmanager
+    def _database_lock(self):
+        url = self.engine.url
+        if self.engine.dialect.name == "postgresql":
+            with self.engine.connect() as conn:
+                conn.exec_driver_sql(f"SELECT pg_advisory_lock({ADVISORY_LOCK_KEY})")
+                try:
+                    yield
+                finally:
+                    conn.exec_driver_sql(f"SELECT pg_advisory_unlock({ADVISORY_LOCK_KEY})")
+        elif self.engine.dialect.name == "sqlite" and url.database not in (None, "", ":memory:") and fcntl:
+            with open(os.path.abspath(url.database) + "-migrate.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        else:
+            # In-memory databases live in one process; the thread lock is enough
+            yield
+
+    def current(self) -> int:
+        """The highest applied version; 0 for a database that has never been migrated."""
+        with self.engine.connect() as conn:
+            if not inspect(conn).has_table(self.version_table.name):
+                return 0
+            return conn.execute(select(func.max(self.version_table.c.version))).scalar() or 0
+
+    def pending(self) -> List[Migration]:
+        current = self.current()
+        return [migration for migration in self.migrations if migration.version > current]
+
+    def stamp(self, version: Optional[int] = None):
+        """Mark migrations up to ``version`` (default: all) as applied without running them."""
+        version = self.head if version is None else version
+        with self.lock():
+            self.version_table.create(self.engine, checkfirst=True)
+            pending = self.pending()
+            with self.engine.begin() as conn:
+                for migration in pending:
+                    if migration.version <= version:
+                        self._record(conn, migration)
+
+    def upgrade(self) -> List[Migration]:
+        applied = []
+        with self.lock():
+            self.version_table.create(self.engine, checkfirst=True)
+            for migration in self.pending():
+                logger.info("Applying schema migration %s: %s", migration.version, migration.description)
+                if migration.transactional:
+                    with self.engine.begin() as conn:
+                        migration.upgrade(conn)
+                        self._record(conn, migration)
+                else:
+                    with self.engine.connect() as conn:
+                        migration.upgrade(conn.execution_options(isolation_level="AUTOCOMMIT"))
+                    with self.engine.begin() as conn:
+                        self._record(conn, migration)
+                applied.append(migration)
+        return applied
+
+    def _record(self, conn, migration: Migration):
+        conn.execute(self.version_table.insert().values(
+            version=migration.version, description=migration.description
+        ))
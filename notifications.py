@@ -0,0 +1,151 @@
+"""
+Asynchronous notification pipeline.
+
+Request handlers ``emit`` events into an in-memory queue and return without
+touching the notifications table. A background thread drains the queue every
+``interval`` seconds, or as soon as ``max_batch`` events are waiting. It
+coalesces events that share a recipient, type and post ("alice and 11 others
+liked your post") and hands the resulting rows to a write callback, which
+stores them with one bulk insert per batch.
+"""
+
+import logging
+import threading
+from collections import deque, namedtuple
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+NotificationEvent = namedtuple(
+    "NotificationEvent", ["user_id", "type", "actor_id", "actor_name", "post_id", "post_title"]
+)
+
+# type -> (title, what the actor did)
+ACTIONS = {
+    "like": ("New like", "liked your post"),
+    "comment": ("New comment", "commented on your post"),
+    "follow": ("New follower", "started following you"),
+}
+
+
+def _actors_phrase(names: List[str]) -> str:
+    if len(names) == 1:
+        return names[0]
+    if len(names) == 2:
+        return f"{names[0]} and {names[1]}"
+    return f"{names[0]} and {len(names) - 1} others"
+
+
+def coalesce(events: Iterable[NotificationEvent]) -> List[dict]:
+    """Merge events per (recipient, type, post) into notification rows."""
+    groups: Dict[tuple, List[NotificationEvent]] = {}
+    for event in events:
+        groups.setdefault((event.user_id, event.type, event.post_id), []).append(event)
+
+    rows = []
+    for (user_id, kind, post_id), grouped in groups.items():
+        title, action = ACTIONS[kind]
+        # Most recent actor first, each actor once
+        names = list(dict.fromkeys(event.actor_name for event in reversed(grouped)))
+        message = f"{_actors_phrase(names)} {action}"
+        if grouped[-1].post_title:
+            message += f' "{grouped[-1].post_title}"'
+        rows.append({
+            "user_id": user_id,
+            "type": kind,
+            "title": title,
+            "message": message,
+            "is_read": False,
+            "related_post_id": post_id,
+            "related_user_id": grouped[-1].actor_id,
+        })
+    return rows
+
+
+class NotificationQueue:
+    def __init__(self, write: Callable[[List[dict]], None], interval: float = 1.0,
+                 max_batch: int = 20000, max_pending: int = 1000000):
+        self._write = write
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._events: deque = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+
+    def emit(self, event: NotificationEvent):
+        with self._lock:
+            if len(self._events) >= self.max_pending:
+                # Notifications are best effort; never let them exhaust memory
+                self.dropped += 1
+                return
+            self._events.append(event)
+            self.emitted += 1
+            full = len(self._events) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._events)
+
+    def flush(self) -> int:
+        """Write every queued event; returns the number of notifications stored."""
+        stored = 0
+        while True:
+            with self._lock:
+                count = min(len(self._events), self.max_batch)
+                batch = [self._events.popleft() for _ in range(count)]
+            if not batch:
+                return stored
+            rows = coalesce(batch)
+            try:
+                self._write(rows)
+            except Exception:
+                # Put the batch back in order so the next flush retries it
+                with self._lock:
+                    self._events.extendleft(reversed(batch))
+                raise
+            with self._lock:
+                self.written += len(rows)
+            stored += len(rows)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._events),
+                "emitted": self.emitted,
+                "written": self.written,
+                "dropped": self.dropped,
+            }
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stopping = False
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write whatever is still queued."""
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write notifications; will retry")
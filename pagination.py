@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination over (created_at, id).
+
+Cursors are opaque to clients: a URL-safe encoding of the sort key of the
+last row on the page. The next page starts strictly after that key, so it
+costs one index range scan no matter how deep the client has paged.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Return the (created_at, id) key of a cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def after_key(created_column, id_column, key: Tuple[datetime, int], descending: bool = True):
+    """A WHERE clause selecting rows that sort strictly after ``key``."""
+    created_at, row_id = key
+    if descending:
+        return or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < row_id)
+        )
+    return or_(
+        created_column > created_at,
+        and_(created_column == created_at, id_column > row_id)
+    )
+
+
+def keyset_order(query, created_column, id_column, cursor: Optional[str], descending: bool = True):
+    """``query`` (a Query or a select) ordered by (created_at, id), starting after ``cursor``."""
+    if cursor:
+        query = query.filter(after_key(created_column, id_column, decode_cursor(cursor), descending))
+
+    if descending:
+        return query.order_by(created_column.desc(), id_column.desc())
+    return query.order_by(created_column.asc(), id_column.asc())
+
+
+def paginate(query, created_column, id_column, cursor: Optional[str], limit: int,
+             descending: bool = True) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page of ``query`` ordered by (created_at, id).
+
+    Returns the rows and the cursor for the following page, or None when
+    this is the last page.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    query = keyset_order(query, created_column, id_column, cursor, descending)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
@@ -0,0 +1,108 @@
+"""
+Password hashing off the event loop.
+
+bcrypt deliberately burns tens to hundreds of milliseconds of CPU per call.
+PasswordHasher runs that work on a bounded thread pool (bcrypt releases the
+GIL while hashing) and refuses new work once the backlog is full, so a burst
+of logins degrades into fast 503s instead of freezing the API.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+class HasherOverloaded(Exception):
+    """Raised when the hashing backlog is full."""
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext, workers: int = 4, max_queue: int = 32):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also return a fresh hash if the stored one is deprecated."""
+        valid, new_hash = await self._submit(self.context.verify_and_update, password, hashed)
+        if new_hash is not None:
+            with self._lock:
+                self._rehashed += 1
+        return valid, new_hash
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            # Running plus waiting jobs; anything beyond workers + max_queue is shed
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HasherOverloaded()
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            executor = self._executor
+        future = executor.submit(self._timed, time.perf_counter(), fn, *args)
+        # Release the slot when the job itself ends, even if the caller gave up
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _timed(self, submitted: float, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            queue_wait, hash_time = started - submitted, finished - started
+            with self._lock:
+                self._completed += 1
+                self._queue_wait_total += queue_wait
+                self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+                self._hash_time_total += hash_time
+                self._hash_time_max = max(self._hash_time_max, hash_time)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "queue_wait_ms_avg": self._queue_wait_total / completed * 1000,
+                "queue_wait_ms_max": self._queue_wait_max * 1000,
+                "hash_ms_avg": self._hash_time_total / completed * 1000,
+                "hash_ms_max": self._hash_time_max * 1000,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,180 @@
+"""
+Trending posts, ranked in memory and refreshed in the background.
+
+Scores use a time-decayed hotness: engagement (likes, comments, views)
+halves in weight every ``half_life`` seconds of age. Written in the log
+domain,
+
+    score = log(1 + engagement) + ln(2) * (created_at - EPOCH) / half_life
+
+the decay becomes a fixed bonus for being recent, so the order of two
+posts only changes when their engagement does. A post's score therefore
+never needs recomputing just because time passed, and a like or comment
+only moves that one post within the ranking.
+
+TrendingRanker keeps (score, post id) pairs in a sorted list, so a page is
+a slice. Endpoints call ``touch`` when a post's counters change; a
+background thread rescores touched posts every ``interval`` seconds and
+rebuilds the whole ranking every ``rebuild_interval`` seconds, which also
+drops posts that aged out of the window. Scores are computed a batch at a
+time, with NumPy when it is installed and in plain Python otherwise.
+"""
+
+import bisect
+import calendar
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# Subtracted from creation times to keep scores small
+EPOCH = calendar.timegm(datetime(2024, 1, 1, tzinfo=timezone.utc).utctimetuple())
+
+# One row per post: (id, created_at, likes, comments, views, is_featured)
+RankingRow = Tuple[int, datetime, int, int, int, bool]
+
+
+def timestamp(value: datetime) -> float:
+    """Seconds since the Unix epoch; naive datetimes (as SQLite returns them) are UTC."""
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+
+class TrendingRanker:
+    def __init__(self, load_rows: Callable[[Optional[Set[int]]], Iterable[Sequence[RankingRow]]],
+                 half_life: float = 12 * 3600, like_weight: float = 1.0, comment_weight: float = 2.0,
+                 view_weight: float = 0.05, featured_boost: float = 24 * 3600,
+                 interval: float = 10.0, rebuild_interval: float = 300.0):
+        """``load_rows(post_ids)`` yields batches of candidate rows; all candidates when ``post_ids`` is None.
+
+        ``featured_boost`` ranks featured posts as if published that many
+        seconds later.
+        """
+        self._load_rows = load_rows
+        self.half_life = half_life
+        self.weights = (like_weight, comment_weight, view_weight)
+        self.featured_boost = featured_boost
+        self.interval = interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._scores: Dict[int, float] = {}
+        # (-score, post_id), ascending: best first, ties broken by older id first
+        self._ranked: List[Tuple[float, int]] = []
+        self._dirty: Set[int] = set()
+        self._built_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def score(self, rows: Sequence[RankingRow]) -> List[float]:
+        """Hotness scores for a batch of rows, in row order."""
+        like_weight, comment_weight, view_weight = self.weights
+        decay = math.log(2) / self.half_life
+        if numpy is not None:
+            created = numpy.fromiter((timestamp(row[1]) for row in rows), dtype=float, count=len(rows))
+            counts = numpy.array([row[2:5] for row in rows], dtype=float).reshape(-1, 3)
+            featured = numpy.fromiter((bool(row[5]) for row in rows), dtype=float, count=len(rows))
+            engagement = counts @ numpy.array(self.weights)
+            age_bonus = (created - EPOCH + featured * self.featured_boost) * decay
+            return (numpy.log1p(numpy.maximum(engagement, 0)) + age_bonus).tolist()
+        return [
+            math.log1p(max(likes * like_weight + comments * comment_weight + views * view_weight, 0))
+            + (timestamp(created_at) - EPOCH + (self.featured_boost if featured else 0)) * decay
+            for _, created_at, likes, comments, views, featured in rows
+        ]
+
+    def touch(self, post_ids: Iterable[int]):
+        """Mark posts whose counters changed; they are rescored on the next refresh."""
+        with self._lock:
+            self._dirty.update(post_ids)
+
+    def page(self, offset: int, limit: int) -> List[int]:
+        """Post ids of one page of the ranking, best first."""
+        with self._lock:
+            return [post_id for _, post_id in self._ranked[offset:offset + limit]]
+
+    @property
+    def built(self) -> bool:
+        return self._built_at is not None
+
+    def rebuild(self):
+        """Score every candidate post and replace the ranking."""
+        scores = {}
+        for rows in self._load_rows(None):
+            scores.update(zip((row[0] for row in rows), self.score(rows)))
+        ranked = sorted((-score, post_id) for post_id, score in scores.items())
+        with self._lock:
+            # Touches that arrived during the rebuild stay queued for the next refresh
+            self._scores, self._ranked = scores, ranked
+            self._built_at = time.monotonic()
+
+    def refresh(self) -> int:
+        """Rebuild when due, otherwise rescore touched posts; returns how many posts were rescored."""
+        if self._built_at is None or time.monotonic() - self._built_at >= self.rebuild_interval:
+            with self._lock:
+                self._dirty.clear()
+            self.rebuild()
+            return len(self._scores)
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        scores = {}
+        try:
+            for rows in self._load_rows(dirty):
+                scores.update(zip((row[0] for row in rows), self.score(rows)))
+        except Exception:
+            with self._lock:
+                self._dirty.update(dirty)
+            raise
+        with self._lock:
+            # Touched posts missing from the rows were deleted, unpublished or aged out
+            for post_id in dirty:
+                old = self._scores.pop(post_id, None)
+                if old is not None:
+                    del self._ranked[bisect.bisect_left(self._ranked, (-old, post_id))]
+                new = scores.get(post_id)
+                if new is not None:
+                    self._scores[post_id] = new
+                    bisect.insort(self._ranked, (-new, post_id))
+        return len(scores)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ranked_posts": len(self._ranked),
+                "pending_updates": len(self._dirty),
+                "seconds_since_rebuild": None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+                "numpy": numpy is not None,
+            }
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-ranker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        # The first pass builds the ranking straight away
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh trending posts; will retry")
+            if self._stop.wait(self.interval):
+                return
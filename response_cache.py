@@ -0,0 +1,216 @@
+"""
+Response caching for anonymous read endpoints.
+
+ResponseCacheMiddleware is a plain ASGI middleware. For a GET without an
+Authorization header on a matching route it serves the stored body and
+headers directly, so a hit never reaches the endpoint, the database or
+Pydantic. Stored responses carry an ETag; a matching If-None-Match gets a
+bodiless 304.
+
+Each rule names the namespaces its responses depend on, e.g. ``posts`` or
+``user:{username}``. Cache keys embed the current generation of every
+namespace, so ``invalidate("posts")`` makes all dependent entries
+unreachable at once and the LRU ages them out.
+
+Two backends share one interface: MemoryBackend (per process) and
+RedisBackend (shared between workers; needs the optional ``redis`` package).
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import Counter, namedtuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from cache import TTLCache
+
+CacheRule = namedtuple("CacheRule", ["pattern", "ttl", "namespaces"])
+CachedResponse = namedtuple("CachedResponse", ["status", "headers", "body", "etag"])
+
+# Never replay these from the cache
+UNCACHEABLE_HEADERS = {b"set-cookie", b"etag", b"x-cache"}
+
+
+def rule(path: str, ttl: float, *namespaces: str) -> CacheRule:
+    """A cache rule for ``path``; ``{name}`` segments match one path segment."""
+    pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", path)
+    return CacheRule(re.compile(f"^{pattern}$"), ttl, namespaces)
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int = 1024):
+        self._entries = TTLCache(maxsize=maxsize)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, response: CachedResponse, ttl: float):
+        self._entries.set(key, response, ttl=ttl)
+
+    async def generations(self, namespaces: Sequence[str]) -> List[int]:
+        with self._lock:
+            return [self._generations.get(namespace, 0) for namespace in namespaces]
+
+    def invalidate(self, *namespaces: str):
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        entries = self._entries.stats()
+        return {"backend": "memory", "size": entries["size"], "maxsize": entries["maxsize"],
+                "evictions": entries["evictions"], **self.counters}
+
+
+class RedisBackend:
+    """Stores responses in Redis (or anything speaking its protocol)."""
+
+    def __init__(self, url: str, prefix: str = "codegenesis:response:"):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as exc:
+            raise RuntimeError("RedisBackend needs the 'redis' package") from exc
+        self.prefix = prefix
+        # The middleware runs on the event loop; invalidation runs inside endpoints
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._sync_client = redis.Redis.from_url(url)
+        self.counters = Counter()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        fields = await self._client.hgetall(self.prefix + key)
+        if not fields:
+            return None
+        headers = [(name.encode("latin-1"), value.encode("latin-1"))
+                   for name, value in json.loads(fields[b"headers"])]
+        return CachedResponse(int(fields[b"status"]), headers, fields[b"body"], fields[b"etag"].decode())
+
+    async def set(self, key: str, response: CachedResponse, ttl: float):
+        headers = json.dumps([(name.decode("latin-1"), value.decode("latin-1"))
+                              for name, value in response.headers])
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.prefix + key, mapping={
+                "status": response.status, "headers": headers,
+                "body": response.body, "etag": response.etag,
+            })
+            pipe.expire(self.prefix + key, max(1, int(ttl)))
+            await pipe.execute()
+
+    async def generations(self, namespaces: Sequence[str]) -> List[int]:
+        if not namespaces:
+            return []
+        values = await self._client.mget([self.prefix + "gen:" + namespace for namespace in namespaces])
+        return [int(value or 0) for value in values]
+
+    def invalidate(self, *namespaces: str):
+        with self._sync_client.pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                pipe.incr(self.prefix + "gen:" + namespace)
+            pipe.execute()
+
+    def clear(self):
+        for key in self._sync_client.scan_iter(self.prefix + "*"):
+            self._sync_client.delete(key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", **self.counters}
+
+
+def create_backend(url: Optional[str], maxsize: int = 1024):
+    """``redis://...`` selects RedisBackend; anything else keeps responses in memory."""
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return MemoryBackend(maxsize=maxsize)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCacheMiddleware:
+    def __init__(self, app, backend, rules: Iterable[CacheRule]):
+        self.app = app
+        self.backend = backend
+        self.rules = list(rules)
+
+    def _match(self, path: str) -> Optional[Tuple[CacheRule, List[str]]]:
+        for cache_rule in self.rules:
+            match = cache_rule.pattern.match(path)
+            if match:
+                return cache_rule, [namespace.format(**match.groupdict())
+                                    for namespace in cache_rule.namespaces]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        matched = None if b"authorization" in headers else self._match(scope["path"])
+        if matched is None:
+            return await self.app(scope, receive, send)
+
+        cache_rule, namespaces = matched
+        generations = await self.backend.generations(namespaces)
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)))
+        key = scope["path"] + "?" + query + "|" + ",".join(
+            f"{namespace}={generation}" for namespace, generation in zip(namespaces, generations)
+        )
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1") or None
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.backend.counters["hits"] += 1
+            return await self._replay(send, cached, if_none_match, b"HIT")
+        self.backend.counters["misses"] += 1
+
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                # Streamed responses have no Content-Length and may not fit in memory
+                if message["status"] != 200 or not any(
+                    name.lower() == b"content-length" for name, _ in message["headers"]
+                ):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            if passthrough:
+                return await send(message)
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                body = b"".join(chunks)
+                etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+                stored = [(name, value) for name, value in start["headers"]
+                          if name.lower() not in UNCACHEABLE_HEADERS]
+                response = CachedResponse(start["status"], stored, body, etag)
+                await self.backend.set(key, response, cache_rule.ttl)
+                await self._replay(send, response, if_none_match, b"MISS")
+
+        await self.app(scope, receive, capture)
+
+    async def _replay(self, send, response: CachedResponse, if_none_match: Optional[str], outcome: bytes):
+        extra = [(b"etag", response.etag.encode("latin-1")), (b"x-cache", outcome),
+                 (b"vary", b"Authorization")]
+        if _etag_matches(if_none_match, response.etag):
+            self.backend.counters["not_modified"] += 1
+            await send({"type": "http.response.start", "status": 304, "headers": extra})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": response.status,
+                    "headers": list(response.headers) + extra})
+        await send({"type": "http.response.body", "body": response.body})
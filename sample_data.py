@@ -8,12 +8,12 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import get_db, User, Tag, Post, get_password_hash
+from app import SessionLocal, User, Tag, Post, bootstrap, get_password_hash, recount_counters
 from sqlalchemy.orm import Session
 
 def create_sample_data():
-    db_gen = get_db()
-    db = next(db_gen)
+    bootstrap()
+    db = SessionLocal()
     
     try:
         # Create sample users
@@ -186,6 +186,8 @@ React makes building interactive UIs simple and efficient.""",
                 db.add(post)
                 print(f"Created post: {post_data['title']}")
         
+        db.flush()
+        recount_counters(db)
         db.commit()
         print("\n✅ Sample data created successfully!")
         print("\nDemo credentials:")
@@ -198,10 +200,6 @@ React makes building interactive UIs simple and efficient.""",
         db.rollback()
     finally:
         db.close()
-        try:
-            next(db_gen)  # Complete the generator
-        except StopIteration:
-            pass
 
 if __name__ == "__main__":
     create_sample_data() 
\ No newline at end of file
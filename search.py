@@ -0,0 +1,322 @@
+"""
+Full-text search over posts.
+
+Two interchangeable engines share one interface (install, search, match_ids,
+filter_clause):
+
+- FTS5SearchIndex: an SQLite FTS5 external-content table over ``posts``
+  kept in sync by triggers on insert, update and delete.
+- InvertedIndex: a pure-Python BM25 inverted index for databases without
+  FTS5. The app keeps it in sync from committed ORM changes, which only
+  covers the process that made them: with several workers, each one
+  searches and filters without the others' new and edited posts until it
+  restarts, so run a single worker or use a database with FTS5. Its
+  filter_clause is a list of matching ids, bounded by ``max_filter_ids``;
+  a broader query raises TooManyMatches rather than dropping matches.
+
+Queries are plain words, all of which must match. A trailing ``*`` makes a
+word a prefix query (``fast*`` matches "fastapi").
+"""
+
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from math import log
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import false, literal_column, select, table, text
+
+SearchHit = namedtuple("SearchHit", ["post_id", "score", "snippet"])
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_TERM_RE = re.compile(r"(\w+)(\*?)")
+
+SNIPPET_TOKENS = 12
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+ELLIPSIS = "…"
+
+# Title matches count for more than body matches
+TITLE_WEIGHT = 3.0
+
+
+class TooManyMatches(Exception):
+    """A filter query matched more posts than the index can pass to the database."""
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return TOKEN_RE.findall(value.lower()) if value else []
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """Split a user query into (term, is_prefix) pairs."""
+    return [(term.lower(), bool(star)) for term, star in QUERY_TERM_RE.findall(query)]
+
+
+class FTS5SearchIndex:
+    def __init__(self, engine, table_name: str = "posts", fts_name: str = "posts_fts"):
+        self.engine = engine
+        self.table_name = table_name
+        self.fts_name = fts_name
+
+    @staticmethod
+    def is_supported(engine) -> bool:
+        if engine.dialect.name != "sqlite":
+            return False
+        with engine.connect() as conn:
+            options = {row[0] for row in conn.exec_driver_sql("PRAGMA compile_options")}
+        return "ENABLE_FTS5" in options
+
+    def install(self):
+        """Create the FTS table and its sync triggers, indexing existing posts once."""
+        t, fts = self.table_name, self.fts_name
+        with self.engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+            ).first()
+            if exists:
+                return
+            conn.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                f"title, content, content='{t}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {t} BEGIN "
+                f"INSERT INTO {fts}(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+            )
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {t} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, title, content) "
+                f"VALUES ('delete', old.id, old.title, old.content); END"
+            )
+            # Only text edits touch the index; view and counter updates do not
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER {fts}_au AFTER UPDATE OF title, content ON {t} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, title, content) "
+                f"VALUES ('delete', old.id, old.title, old.content); "
+                f"INSERT INTO {fts}(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+            )
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    @staticmethod
+    def match_expression(query: str) -> Optional[str]:
+        terms = parse_query(query)
+        if not terms:
+            return None
+        return " ".join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+
+    def search(self, query: str, limit: int = 10, offset: int = 0) -> List[SearchHit]:
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        fts = self.fts_name
+        sql = text(
+            f"SELECT rowid, bm25({fts}, :title_weight, 1.0) AS rank, "
+            f"snippet({fts}, -1, :start, :end, :ellipsis, :tokens) "
+            f"FROM {fts} WHERE {fts} MATCH :query ORDER BY rank LIMIT :limit OFFSET :offset"
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {
+                "title_weight": TITLE_WEIGHT, "start": HIGHLIGHT_START, "end": HIGHLIGHT_END,
+                "ellipsis": ELLIPSIS, "tokens": SNIPPET_TOKENS, "query": expression,
+                "limit": limit, "offset": offset,
+            }).all()
+        # bm25() is lower-is-better; flip it so higher scores rank first
+        return [SearchHit(post_id, -rank, snippet) for post_id, rank, snippet in rows]
+
+    def match_ids(self, query: str) -> List[int]:
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        with self.engine.connect() as conn:
+            return list(conn.execute(
+                text(f"SELECT rowid FROM {self.fts_name} WHERE {self.fts_name} MATCH :query"),
+                {"query": expression},
+            ).scalars())
+
+    def filter_clause(self, query: str, id_column):
+        """A WHERE clause restricting ``id_column`` to matching posts."""
+        expression = self.match_expression(query)
+        if expression is None:
+            return false()
+        fts = self.fts_name
+        matches = select(literal_column("rowid")).select_from(table(fts)).where(
+            text(f"{fts} MATCH :fts_query").bindparams(fts_query=expression)
+        )
+        return id_column.in_(matches)
+
+
+class InvertedIndex:
+    """In-memory BM25 index used when FTS5 is unavailable."""
+
+    k1 = 1.2
+    b = 0.75
+    # Most ids filter_clause sends in one IN list
+    max_filter_ids = 5000
+
+    def __init__(self, engine=None, table_name: str = "posts"):
+        self.engine = engine
+        self.table_name = table_name
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._documents: Dict[int, Tuple[str, str]] = {}
+        self._total_length = 0.0
+        self._sorted_terms: Optional[List[str]] = None
+
+    def install(self, batch_size: int = 5000):
+        """Index every existing post."""
+        if self.engine is None:
+            return
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(
+                text(f"SELECT id, title, content FROM {self.table_name}")
+            )
+            for rows in result.partitions(batch_size):
+                self.add_many(rows)
+
+    def add_many(self, rows: Iterable[Tuple[int, str, str]]):
+        with self._lock:
+            for post_id, title, content in rows:
+                self._add(post_id, title, content)
+
+    def add(self, post_id: int, title: Optional[str], content: Optional[str]):
+        with self._lock:
+            self._add(post_id, title, content)
+
+    def remove(self, post_id: int):
+        with self._lock:
+            self._remove(post_id)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _add(self, post_id, title, content):
+        self._remove(post_id)
+        weights = Counter()
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(content):
+            weights[token] += 1.0
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted_terms = None
+            postings[post_id] = weight
+        length = sum(weights.values())
+        self._doc_terms[post_id] = weights
+        self._doc_lengths[post_id] = length
+        self._documents[post_id] = (title or "", content or "")
+        self._total_length += length
+
+    def _remove(self, post_id):
+        weights = self._doc_terms.pop(post_id, None)
+        if weights is None:
+            return
+        for term in weights:
+            postings = self._postings[term]
+            del postings[post_id]
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+        self._total_length -= self._doc_lengths.pop(post_id)
+        del self._documents[post_id]
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [term] if term in self._postings else []
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        start = bisect_left(terms, term)
+        end = start
+        while end < len(terms) and terms[end].startswith(term):
+            end += 1
+        return terms[start:end]
+
+    def _score(self, query: str) -> Tuple[Dict[int, float], Set[str]]:
+        terms = parse_query(query)
+        if not terms:
+            return {}, set()
+        documents = len(self._doc_lengths)
+        average_length = self._total_length / documents if documents else 0.0
+        scores: Optional[Dict[int, float]] = None
+        matched_terms: Set[str] = set()
+        for term, prefix in terms:
+            term_scores: Dict[int, float] = {}
+            for expanded in self._expand(term, prefix):
+                matched_terms.add(expanded)
+                postings = self._postings[expanded]
+                idf = log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                for post_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[post_id] / average_length)
+                    term_scores[post_id] = term_scores.get(post_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            # Every query term must match
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {post_id: score + term_scores[post_id]
+                          for post_id, score in scores.items() if post_id in term_scores}
+            if not scores:
+                return {}, matched_terms
+        return scores or {}, matched_terms
+
+    def search(self, query: str, limit: int = 10, offset: int = 0) -> List[SearchHit]:
+        with self._lock:
+            scores, matched_terms = self._score(query)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[offset:offset + limit]
+            return [SearchHit(post_id, score, self._snippet(post_id, matched_terms))
+                    for post_id, score in ranked]
+
+    def match_ids(self, query: str) -> List[int]:
+        with self._lock:
+            scores, _ = self._score(query)
+            return sorted(scores, key=lambda post_id: -scores[post_id])
+
+    def filter_clause(self, query: str, id_column):
+        """A WHERE clause restricting ``id_column`` to matching posts.
+
+        Raises TooManyMatches when more than ``max_filter_ids`` posts match.
+        """
+        ids = self.match_ids(query)
+        if len(ids) > self.max_filter_ids:
+            raise TooManyMatches(f"More than {self.max_filter_ids} posts match {query!r}")
+        return id_column.in_(ids) if ids else false()
+
+    def _snippet(self, post_id: int, matched_terms: Set[str]) -> str:
+        title, content = self._documents[post_id]
+        for source in (content, title):
+            tokens = list(TOKEN_RE.finditer(source))
+            hit = next((i for i, m in enumerate(tokens) if m.group().lower() in matched_terms), None)
+            if hit is None:
+                continue
+            first = max(0, hit - SNIPPET_TOKENS // 2)
+            last = min(len(tokens), first + SNIPPET_TOKENS)
+            first = max(0, last - SNIPPET_TOKENS)
+            parts = []
+            cursor = tokens[first].start()
+            for match in tokens[first:last]:
+                parts.append(source[cursor:match.start()])
+                word = match.group()
+                if word.lower() in matched_terms:
+                    word = f"{HIGHLIGHT_START}{word}{HIGHLIGHT_END}"
+                parts.append(word)
+                cursor = match.end()
+            snippet = "".join(parts)
+            if first > 0:
+                snippet = ELLIPSIS + snippet
+            if last < len(tokens):
+                snippet += ELLIPSIS
+            return snippet
+        return title
+
+
+def create_search_index(engine):
+    """FTS5 when the database supports it, otherwise the in-memory index."""
+    if FTS5SearchIndex.is_supported(engine):
+        return FTS5SearchIndex(engine)
+    return InvertedIndex(engine)
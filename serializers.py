@@ -0,0 +1,124 @@
+"""
+Allocation-light JSON responses built straight from ORM objects.
+
+Returning Pydantic models makes FastAPI validate them against the route's
+response_model and then encode the result: two full passes over every
+nested author and tag, on top of building the models. Handlers instead map
+rows to plain dicts in one pass with ``Fields``, reuse the dict of an author
+or tag that appears more than once in a response, and return an
+``ORJSONResponse`` that is rendered once. The field lists come from the same
+response models the routes declare for OpenAPI, so the two cannot drift.
+
+``stream_json`` sends a listing as one JSON array written batch by batch,
+for responses too large to build in memory.
+"""
+
+from typing import Iterable, Optional, Tuple, Type
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response, StreamingResponse
+
+
+def dumps(content) -> bytes:
+    # Pydantic writes UTC datetimes with a "Z" suffix; match it
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_response(content, response: Optional[Response] = None) -> ORJSONResponse:
+    """Render ``content``, keeping headers a handler set on its injected ``response``."""
+    return ORJSONResponse(content, headers=response.headers if response is not None else None)
+
+
+def _array_chunk(batch: list, first: bool) -> bytes:
+    # The items of a rendered list, without its brackets
+    items = dumps(batch)[1:-1]
+    return items if first else b"," + items
+
+
+def stream_json(batches: Iterable[list], response: Optional[Response] = None) -> StreamingResponse:
+    """A JSON array streamed from ``batches`` of dicts (a sync or async iterable)."""
+    if hasattr(batches, "__aiter__"):
+        async def chunks():
+            yield b"["
+            first = True
+            async for batch in batches:
+                if batch:
+                    yield _array_chunk(batch, first)
+                    first = False
+            yield b"]"
+    else:
+        def chunks():
+            yield b"["
+            first = True
+            for batch in batches:
+                if batch:
+                    yield _array_chunk(batch, first)
+                    first = False
+            yield b"]"
+    return StreamingResponse(chunks(), media_type="application/json",
+                             headers=response.headers if response is not None else None)
+
+
+_REQUIRED = object()
+_MUTABLE_DEFAULTS = (list, dict, set)
+
+
+class Fields:
+    """Copies the fields of a response model off an object into a dict.
+
+    Attributes the object lacks fall back to the field's default, so a
+    ``TagResponse`` can be filled from a ``Tag`` row that has no posts_count;
+    list and dict defaults are copied, so no two rows share one.
+    Keyword arguments override or supply fields (nested objects, computed
+    values) and are placed in model order.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.fields: Tuple[Tuple[str, object], ...] = tuple(
+            (name, _REQUIRED if field.is_required() else field.get_default(call_default_factory=True))
+            for name, field in model.model_fields.items()
+        )
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(name for name, _ in self.fields)
+
+    def only(self, names) -> "Fields":
+        """The same mapping restricted to ``names``, still in model order."""
+        subset = Fields.__new__(Fields)
+        subset.fields = tuple(field for field in self.fields if field[0] in names)
+        return subset
+
+    def __call__(self, obj, **values) -> dict:
+        data = {}
+        for name, default in self.fields:
+            if name in values:
+                data[name] = values[name]
+            elif default is _REQUIRED:
+                data[name] = getattr(obj, name)
+            else:
+                value = getattr(obj, name, default)
+                data[name] = value.copy() if value is default and type(default) in _MUTABLE_DEFAULTS else value
+        return data
+
+
+class Memo(dict):
+    """Per-response cache so an object shared by many rows is mapped once."""
+
+    def __init__(self, fields: Fields):
+        super().__init__()
+        self.fields = fields
+
+    def get_dict(self, obj) -> dict:
+        data = self.get(obj.id)
+        if data is None:
+            data = self[obj.id] = self.fields(obj)
+        return data
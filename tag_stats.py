@@ -0,0 +1,151 @@
+"""
+In-memory tag statistics: posts per tag and tag co-occurrence.
+
+TagStats holds every tag's response fields, how many posts carry it, and a
+sparse co-occurrence matrix (for each tag, how many posts it shares with
+each other tag), all derived from ``post_tags``. Listing tags by popularity
+and finding related tags are then answered without touching the database.
+
+New posts and tags are folded in as they are committed. Changes made by
+other processes (another worker, ``manage.py seed``) are picked up by a full
+rebuild once the statistics are older than ``max_age`` seconds; the rebuild
+runs in whichever request notices, while concurrent readers keep being
+served the previous snapshot. Posts and tags added while a rebuild is
+loading are replayed onto its result, unless the load already saw them.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# post_tags rows as (post_id, tag_id), ordered by post_id
+TagRows = Iterable[Tuple[int, int]]
+
+
+class TagStats:
+    def __init__(self, load: Callable[[], Tuple[Iterable[dict], TagRows]], max_age: float = 300.0):
+        """``load()`` returns the response dicts of every tag and all post_tags rows ordered by post."""
+        self._load = load
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._tags: Dict[int, dict] = {}
+        self._ids_by_name: Dict[str, int] = {}
+        self._counts: Counter = Counter()
+        self._pairs: Dict[int, Counter] = defaultdict(Counter)
+        self._popular: Optional[List[dict]] = None
+        self._built_at: Optional[float] = None
+        # Additions made while a rebuild loads; None when no rebuild is running
+        self._pending_tags: Optional[List[dict]] = None
+        self._pending_posts: Optional[List[Tuple[int, List[int]]]] = None
+
+    def rebuild(self):
+        with self._lock:
+            self._pending_tags, self._pending_posts = [], []
+        try:
+            tags, rows = self._load()
+            tags = {tag["id"]: tag for tag in tags}
+            counts = Counter()
+            pairs = defaultdict(Counter)
+            loaded = set()
+            for post_id, post_rows in groupby(rows, key=itemgetter(0)):
+                loaded.add(post_id)
+                _count_post(counts, pairs, [tag_id for _, tag_id in post_rows])
+        except BaseException:
+            with self._lock:
+                self._pending_tags = self._pending_posts = None
+            raise
+        with self._lock:
+            # Committed before the load read them or after; count each post once
+            for tag in self._pending_tags:
+                tags[tag["id"]] = tag
+            for post_id, tag_ids in self._pending_posts:
+                if post_id not in loaded:
+                    _count_post(counts, pairs, tag_ids)
+            self._pending_tags = self._pending_posts = None
+            self._tags = tags
+            self._ids_by_name = {tag["name"]: tag_id for tag_id, tag in tags.items()}
+            self._counts, self._pairs = counts, pairs
+            self._popular = None
+            self._built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Build on first use and rebuild once stale; only one caller rebuilds at a time."""
+        if self._built_at is not None and time.monotonic() - self._built_at < self.max_age:
+            return
+        # Until the first build there is nothing to serve, so wait for it
+        if not self._rebuild_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.max_age:
+                self.rebuild()
+        finally:
+            self._rebuild_lock.release()
+
+    def add_tags(self, tags: Iterable[dict]):
+        """Register newly created tags (TagResponse dicts)."""
+        with self._lock:
+            for tag in tags:
+                self._tags[tag["id"]] = tag
+                self._ids_by_name[tag["name"]] = tag["id"]
+                if self._pending_tags is not None:
+                    self._pending_tags.append(tag)
+            self._popular = None
+
+    def add_post(self, post_id: int, tag_ids: Iterable[int]):
+        """Count a new post carrying ``tag_ids``."""
+        tag_ids = list(dict.fromkeys(tag_ids))
+        if not tag_ids:
+            return
+        with self._lock:
+            _count_post(self._counts, self._pairs, tag_ids)
+            if self._pending_posts is not None:
+                self._pending_posts.append((post_id, tag_ids))
+            self._popular = None
+
+    def popular(self) -> List[dict]:
+        """TagResponse dicts of every tag, most used first; ties by name."""
+        with self._lock:
+            if self._popular is None:
+                self._popular = sorted(
+                    ({**tag, "posts_count": self._counts[tag_id]} for tag_id, tag in self._tags.items()),
+                    key=lambda tag: (-tag["posts_count"], tag["name"])
+                )
+            return self._popular
+
+    def related(self, name: str, limit: int = 10) -> Optional[List[dict]]:
+        """Tags most often used together with ``name``, or None for an unknown tag.
+
+        ``similarity`` is the Jaccard index of the two tags' post sets.
+        """
+        with self._lock:
+            tag_id = self._ids_by_name.get(name)
+            if tag_id is None:
+                return None
+            count = self._counts[tag_id]
+            shared = self._pairs[tag_id].most_common(limit) if tag_id in self._pairs else []
+            return [{
+                **self._tags[other_id],
+                "posts_count": self._counts[other_id],
+                "co_occurrences": together,
+                "similarity": round(together / (count + self._counts[other_id] - together), 4),
+            } for other_id, together in shared if other_id in self._tags]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tags": len(self._tags),
+                "tag_pairs": sum(len(others) for others in self._pairs.values()) // 2,
+                "seconds_since_rebuild": None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+            }
+
+
+def _count_post(counts: Counter, pairs: Dict[int, Counter], tag_ids: List[int]):
+    counts.update(tag_ids)
+    for tag_id in tag_ids:
+        for other_id in tag_ids:
+            if other_id != tag_id:
+                pairs[tag_id][other_id] += 1
@@ -35,4 +35,718 @@ def test_list_posts():
     response = client.get("/posts")
     assert response.status_code == 200
     data = response.json()
-    assert isinstance(data, list) 
\ No newline at end of file
+    assert isinstance(data, list) 
+
+def test_list_posts_statement_count_is_constant():
+    from uuid import uuid4
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import SessionLocal, User, Post, Tag, create_access_token
+
+    db = SessionLocal()
+    username = f"feed_{uuid4().hex[:8]}"
+    author = User(username=username, email=f"{username}@example.com",
+                  hashed_password="x", full_name="Feed Author")
+    tag = Tag(name=f"feedtag_{uuid4().hex[:8]}")
+    posts = [Post(title=f"Post {i}", content="body", author=author, tags=[tag])
+             for i in range(100)]
+    db.add_all(posts)
+    db.commit()
+    author.liked_posts.extend(posts[:5])
+    db.commit()
+    db.close()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def statements_for(limit):
+        statements.clear()
+        event.listen(Engine, "before_cursor_execute", count)
+        try:
+            response = client.get(f"/posts?author={username}&limit={limit}", headers=headers)
+        finally:
+            event.remove(Engine, "before_cursor_execute", count)
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        return len(statements)
+
+    # Warm the authenticated-user cache so both runs see the same lookups
+    statements_for(10)
+    assert statements_for(10) == statements_for(100)
+
+
+def make_user(prefix):
+    from uuid import uuid4
+    from app import SessionLocal, User, create_access_token
+
+    username = f"{prefix}_{uuid4().hex[:8]}"
+    db = SessionLocal()
+    db.add(User(username=username, email=f"{username}@example.com",
+                hashed_password="x", full_name=username))
+    db.commit()
+    db.close()
+    return username, {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def test_post_counters_follow_likes_and_comments():
+    author, author_headers = make_user("counter_author")
+    _, reader_headers = make_user("counter_reader")
+
+    post_id = client.post("/posts", json={"title": "Counted", "content": "body"},
+                          headers=author_headers).json()["id"]
+    client.post(f"/posts/{post_id}/like", headers=reader_headers)
+    client.post(f"/posts/{post_id}/comments", json={"content": "hi"}, headers=reader_headers)
+    data = client.get(f"/posts/{post_id}").json()
+    assert data["likes_count"] == 1
+    assert data["comments_count"] == 1
+    assert data["author"]["posts_count"] == 1
+
+    client.delete(f"/posts/{post_id}/like", headers=reader_headers)
+    assert client.get(f"/posts/{post_id}").json()["likes_count"] == 0
+
+
+def test_views_are_buffered_until_flush():
+    from app import SessionLocal, Post, view_counter
+
+    _, headers = make_user("viewer")
+    post_id = client.post("/posts", json={"title": "Viewed", "content": "body"},
+                          headers=headers).json()["id"]
+    client.get(f"/posts/{post_id}")
+    assert client.get(f"/posts/{post_id}").json()["view_count"] == 2
+    assert client.get("/metrics").json()["views_pending_flush"] >= 2
+
+    db = SessionLocal()
+    assert db.get(Post, post_id).view_count == 0
+    view_counter.flush()
+    db.expire_all()
+    assert db.get(Post, post_id).view_count == 2
+    db.close()
+    assert view_counter.pending(post_id) == 0
+
+
+def test_cursor_pagination_walks_every_post_once():
+    from app import SessionLocal, User, Post
+
+    username, _ = make_user("pager")
+    db = SessionLocal()
+    author = db.query(User).filter(User.username == username).one()
+    # Inserted in one statement, so many rows share a created_at second
+    db.add_all([Post(title=f"Page {i}", content="body", author_id=author.id) for i in range(25)])
+    db.commit()
+    db.close()
+
+    seen, cursor = [], None
+    while True:
+        url = f"/posts?author={username}&limit=10" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(post["id"] for post in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 25
+    assert client.get("/posts?cursor=not-a-cursor").status_code == 400
+
+
+def test_page_sizes_are_bounded():
+    from app import MAX_PAGE_SIZE, SessionLocal, Post
+    from pagination import paginate
+
+    _, headers = make_user("bounded")
+    post_id = client.post("/posts", json={"title": "Bounded", "content": "body"}, headers=headers).json()["id"]
+    for url in ("/posts", f"/posts/{post_id}/comments", "/notifications"):
+        for limit in (0, -1, -3, MAX_PAGE_SIZE + 1):
+            assert client.get(f"{url}?limit={limit}", headers=headers).status_code == 422, (url, limit)
+        assert client.get(f"{url}?limit={MAX_PAGE_SIZE}", headers=headers).status_code == 200
+    assert client.get("/posts?skip=-1").status_code == 422
+
+    db = SessionLocal()
+    try:
+        with pytest.raises(ValueError):
+            paginate(db.query(Post), Post.created_at, Post.id, None, 0)
+    finally:
+        db.close()
+
+
+def test_comments_are_paginated_with_reply_counts():
+    _, headers = make_user("commenter")
+    post_id = client.post("/posts", json={"title": "Thread", "content": "body"},
+                          headers=headers).json()["id"]
+    first = client.post(f"/posts/{post_id}/comments", json={"content": "first"}, headers=headers).json()
+    client.post(f"/posts/{post_id}/comments", json={"content": "second"}, headers=headers)
+    client.post(f"/posts/{post_id}/comments", json={"content": "reply", "parent_id": first["id"]},
+                headers=headers)
+
+    page = client.get(f"/posts/{post_id}/comments?limit=1")
+    assert [c["content"] for c in page.json()] == ["first"]
+    assert page.json()[0]["replies_count"] == 1
+    cursor = page.headers["X-Next-Cursor"]
+    rest = client.get(f"/posts/{post_id}/comments?limit=1&cursor={cursor}")
+    assert [c["content"] for c in rest.json()] == ["second"]
+    assert "X-Next-Cursor" not in rest.headers
+
+
+def test_search_ranks_prefix_matches_with_snippets():
+    from uuid import uuid4
+
+    _, headers = make_user("searcher")
+    word = f"zq{uuid4().hex[:8]}"
+    client.post("/posts", json={"title": f"About {word}", "content": f"All about {word}ing."},
+                headers=headers)
+    client.post("/posts", json={"title": "Other", "content": f"Mentions {word} once."},
+                headers=headers)
+
+    hits = client.get(f"/posts/search?q={word}*").json()
+    assert len(hits) == 2
+    assert hits[0]["post"]["title"] == f"About {word}"
+    assert "<mark>" in hits[0]["snippet"]
+    assert len(client.get(f"/posts?search={word}").json()) == 2
+    for params in ({"limit": 0}, {"limit": -1}, {"offset": -1}):
+        assert client.get("/posts/search", params={"q": word, **params}).status_code == 422
+
+
+def test_inverted_index_fallback():
+    from search import InvertedIndex
+
+    index = InvertedIndex()
+    index.add(1, "FastAPI tips", "Dependency injection in FastAPI.")
+    index.add(2, "Cooking", "A recipe that is not about fast food.")
+    index.add(3, "Python", "Python and fastapi together.")
+    assert [hit.post_id for hit in index.search("fastapi")][0] == 1
+    assert set(index.match_ids("fast*")) == {1, 2, 3}
+    assert "<mark>fastapi</mark>" in index.search("fastapi python")[0].snippet
+    index.remove(1)
+    assert index.match_ids("fastapi") == [3]
+
+
+def test_inverted_index_filter_is_bounded(monkeypatch):
+    import app
+    from search import InvertedIndex, TooManyMatches
+
+    _, headers = make_user("filtered")
+    ids = [client.post("/posts", json={"title": f"Bounded filter {i}", "content": "body"}, headers=headers)
+           .json()["id"] for i in range(3)]
+    index = InvertedIndex()
+    index.add_many((post_id, "Bounded filter", "body") for post_id in ids)
+    monkeypatch.setattr(app, "search_index", index)
+
+    index.max_filter_ids = 3
+    assert sorted(post["id"] for post in client.get("/posts?search=bounded", headers=headers).json()) == ids
+    # Rather than silently dropping matches past the cap
+    index.max_filter_ids = 2
+    with pytest.raises(TooManyMatches):
+        index.filter_clause("bounded", app.Post.id)
+    assert client.get("/posts?search=bounded", headers=headers).status_code == 400
+
+
+def test_anonymous_reads_are_cached_until_a_write():
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    username, headers = make_user("cachedfeed")
+    client.post("/posts", json={"title": "First", "content": "body", "tag_names": []}, headers=headers)
+    url = f"/posts?author={username}"
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    first = client.get(url)
+    assert first.headers["x-cache"] == "MISS"
+    event.listen(Engine, "before_cursor_execute", count)
+    try:
+        second = client.get(url)
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    assert statements == []
+
+    etag = second.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # Writes through the API invalidate dependent responses
+    client.post("/posts", json={"title": "Second", "content": "body", "tag_names": []}, headers=headers)
+    fresh = client.get(url, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["x-cache"] == "MISS"
+    assert [post["title"] for post in fresh.json()] == ["Second", "First"]
+
+    # Authenticated requests bypass the cache
+    assert "x-cache" not in client.get(url, headers=headers).headers
+
+
+def test_create_post_resolves_tags_in_bulk():
+    from uuid import uuid4
+    from sqlalchemy import event
+    import app
+
+    # Requests run on the async engine when ASYNC_DATABASE is set
+    engine = app.async_engine.sync_engine if app.ASYNC_DATABASE else app.engine
+    _, headers = make_user("tagger")
+    existing = f"existing_{uuid4().hex[:8]}"
+    client.post("/posts", json={"title": "Seed", "content": "body", "tag_names": [existing]}, headers=headers)
+
+    def create(tag_names):
+        statements, commits = [], []
+        count = lambda conn, cursor, statement, *args: statements.append(statement)
+        commit = lambda conn: commits.append(conn)
+        event.listen(engine, "before_cursor_execute", count)
+        event.listen(engine, "commit", commit)
+        try:
+            response = client.post("/posts", json={"title": "Tagged", "content": "body", "tag_names": tag_names},
+                                   headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+            event.remove(engine, "commit", commit)
+        assert response.status_code == 200
+        assert [tag["name"] for tag in response.json()["tags"]] == list(dict.fromkeys(tag_names))
+        assert len(commits) == 1
+        return len(statements)
+
+    few = create([existing, f"new_{uuid4().hex[:8]}"])
+    many = create([existing, existing] + [f"new_{uuid4().hex[:8]}" for _ in range(10)])
+    assert few == many
+
+
+def test_comment_tree_is_loaded_whole_or_depth_limited():
+    _, headers = make_user("threader")
+    post_id = client.post("/posts", json={"title": "Tree", "content": "body"},
+                          headers=headers).json()["id"]
+
+    def comment(content, parent_id=None):
+        return client.post(f"/posts/{post_id}/comments", json={"content": content, "parent_id": parent_id},
+                           headers=headers).json()["id"]
+
+    root = comment("root")
+    child = comment("child", root)
+    comment("grandchild", child)
+    comment("sibling")
+
+    tree = client.get(f"/posts/{post_id}/comments/tree").json()
+    assert [node["content"] for node in tree] == ["root", "sibling"]
+    assert tree[0]["replies_count"] == 1
+    assert tree[0]["replies"][0]["replies"][0]["content"] == "grandchild"
+    assert tree[0]["replies"][0]["replies"][0]["depth"] == 2
+
+    # A depth-limited subtree still reports the replies it left out
+    subtree = client.get(f"/posts/{post_id}/comments/tree?root_id={child}&max_depth=0").json()
+    assert [(node["content"], node["replies"], node["replies_count"]) for node in subtree] == [("child", [], 1)]
+    assert client.get(f"/posts/{post_id}/comments/tree?root_id=0").status_code == 404
+
+
+def test_likes_are_checked_with_the_unique_index():
+    from sqlalchemy import event
+    import app
+
+    engine = app.async_engine.sync_engine if app.ASYNC_DATABASE else app.engine
+    _, headers = make_user("liker")
+    post_ids = [client.post("/posts", json={"title": f"Likeable {i}", "content": "body"},
+                            headers=headers).json()["id"] for i in range(3)]
+    for post_id in post_ids[1:]:
+        assert client.post(f"/posts/{post_id}/like", headers=headers).status_code == 200
+
+    statements = []
+    count = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        assert client.post(f"/posts/{post_ids[0]}/like", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    # No statement loads the user's liked posts to test membership
+    assert not [s for s in statements if "FROM posts, post_likes" in s or "JOIN post_likes" in s]
+
+    assert client.post(f"/posts/{post_ids[0]}/like", headers=headers).status_code == 400
+    assert client.delete(f"/posts/{post_ids[0]}/like", headers=headers).status_code == 200
+    assert client.delete(f"/posts/{post_ids[0]}/like", headers=headers).status_code == 400
+    post = client.get(f"/posts/{post_ids[1]}", headers=headers).json()
+    assert post["likes_count"] == 1 and post["is_liked_by_user"]
+
+
+def test_hot_queries_use_indexes():
+    import re
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    import app
+
+    author, author_headers = make_user("planauthor")
+    reader, headers = make_user("planreader")
+    captured = []
+    capture = lambda conn, cursor, statement, parameters, context, executemany: captured.append(
+        (statement, parameters[0] if executemany else parameters)
+    )
+    event.listen(Engine, "before_cursor_execute", capture)
+    try:
+        assert client.post(f"/users/{author}/follow", headers=headers).status_code == 200
+        post_id = client.post("/posts", json={"title": "Planned", "content": "body", "tag_names": ["plans"]},
+                              headers=author_headers).json()["id"]
+        comment_id = client.post(f"/posts/{post_id}/comments", json={"content": "root"},
+                                 headers=headers).json()["id"]
+        client.post(f"/posts/{post_id}/comments", json={"content": "reply", "parent_id": comment_id},
+                    headers=author_headers)
+        client.post(f"/posts/{post_id}/like", headers=headers)
+        client.get("/notifications", headers=author_headers)
+        app.notification_queue.flush()
+        for path in ("/posts", f"/posts?author={author}", "/posts?tag=plans", f"/posts/{post_id}",
+                     f"/posts/{post_id}/comments", f"/posts/{post_id}/comments/tree", "/feed",
+                     f"/users/{author}", "/notifications", "/notifications/unread-count"):
+            assert client.get(path, headers=author_headers).status_code == 200, path
+        client.put("/notifications/read", json={}, headers=author_headers)
+        client.delete(f"/posts/{post_id}/like", headers=headers)
+        client.delete(f"/users/{author}/follow", headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", capture)
+
+    tables = set(app.Base.metadata.tables)
+    full_scans = set()
+    with app.engine.connect() as conn:
+        for statement, parameters in captured:
+            if not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+                continue
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            for (*_, detail) in plan:
+                # SCAN walks a whole table or index, SEARCH seeks into one; an
+                # AUTOMATIC index is one SQLite builds per query for lack of ours
+                match = re.match(r"(?:SCAN|SEARCH) (\w+)", detail)
+                if match and match.group(1) in tables and (detail.startswith("SCAN") or "AUTOMATIC" in detail):
+                    full_scans.add((detail, " ".join(statement.split())))
+    assert not full_scans, full_scans
+
+
+def test_online_index_builds_leave_the_shared_index_unchanged(monkeypatch):
+    from types import SimpleNamespace
+    from app import Post
+    from migrations import create_index_online
+
+    index = next(iter(Post.__table__.indexes))
+    seen = []
+    monkeypatch.setattr(index, "create", lambda bind, checkfirst: seen.append(
+        index.dialect_options["postgresql"]["concurrently"]
+    ))
+    create_index_online(SimpleNamespace(dialect=SimpleNamespace(name="postgresql")), index)
+    assert seen == [True]
+    assert not index.dialect_options["postgresql"]["concurrently"]
+
+def test_importing_the_app_does_no_database_io(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {repo!r}); import app"],
+                   cwd=tmp_path, check=True)
+    # SQLite creates its file on first connect
+    assert not (tmp_path / "codegenesis.db").exists()
+
+
+def test_workers_bootstrapping_a_fresh_database_at_once(tmp_path):
+    import os
+    import subprocess
+    import sys
+    from app import migrator
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    script = (f"import sys; sys.path.insert(0, {repo!r}); import app; app.bootstrap(); "
+              "print(app.migrator.current())")
+    workers = [subprocess.Popen([sys.executable, "-c", script], cwd=tmp_path, text=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE) for _ in range(4)]
+    results = [(worker.wait(), *worker.communicate()) for worker in workers]
+    assert [(code, out.strip()) for code, out, _ in results] == [(0, str(migrator.head))] * 4, results
+
+
+def test_get_requests_use_the_read_only_pool():
+    from sqlalchemy import event
+    from sqlalchemy.exc import OperationalError
+    import app
+
+    write_engine, read_engine = (
+        (app.async_engine.sync_engine, app.async_read_engine.sync_engine) if app.ASYNC_DATABASE
+        else (app.engine, app.read_engine)
+    )
+    _, headers = make_user("pooled")
+    used = []
+    on_write = lambda *args: used.append("write")
+    on_read = lambda *args: used.append("read")
+    event.listen(write_engine, "before_cursor_execute", on_write)
+    event.listen(read_engine, "before_cursor_execute", on_read)
+    try:
+        assert client.get("/users/me", headers=headers).status_code == 200
+        assert set(used) == {"read"}
+        used.clear()
+        assert client.put("/users/me", json={"bio": "pooled"}, headers=headers).status_code == 200
+        assert set(used) == {"write"}
+    finally:
+        event.remove(write_engine, "before_cursor_execute", on_write)
+        event.remove(read_engine, "before_cursor_execute", on_read)
+
+    # Notification streams authenticate outside the request session
+    _, stream_headers = make_user("streamer")
+    used.clear()
+    event.listen(app.engine, "before_cursor_execute", on_write)
+    event.listen(app.read_engine, "before_cursor_execute", on_read)
+    try:
+        assert app._authenticate_stream(stream_headers["Authorization"].split()[1]) is not None
+        assert set(used) == {"read"}
+    finally:
+        event.remove(app.engine, "before_cursor_execute", on_write)
+        event.remove(app.read_engine, "before_cursor_execute", on_read)
+
+    with app.read_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.exec_driver_sql("DELETE FROM tags")
+
+
+def test_blocking_calls_stay_off_the_event_loop(monkeypatch):
+    import asyncio
+    import app
+
+    on_loop = []
+
+    def probe(fn):
+        def called(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(fn.__name__)
+            except RuntimeError:
+                pass
+            return fn(*args, **kwargs)
+        return called
+
+    class SharedBackend:
+        invalidate = probe(lambda *namespaces: None)
+
+    monkeypatch.setattr(app.search_index, "search", probe(app.search_index.search))
+    monkeypatch.setattr(app.trending, "refresh", probe(app.trending.refresh))
+    monkeypatch.setattr(app.trending, "_built_at", None)
+    monkeypatch.setattr(app, "response_cache", SharedBackend())
+    _, headers = make_user("offloop")
+
+    assert client.get("/posts/search", params={"q": "anything"}).status_code == 200
+    assert client.get("/posts/trending").status_code == 200
+    assert client.post("/posts", json={"title": "Off the loop", "content": "body"}, headers=headers).status_code == 200
+    assert on_loop == []
+
+
+def test_prebuilt_responses_match_their_models():
+    from typing import List
+    from pydantic import BaseModel, TypeAdapter
+    from app import (
+        CommentResponse, NotificationResponse, PostResponse, PostSearchResult, TagResponse, UserResponse,
+        notification_queue
+    )
+    from serializers import Fields
+
+    username, headers = make_user("shaped")
+    _, fan_headers = make_user("shaped_fan")
+    post = client.post("/posts", json={"title": "Shaped words", "content": "body", "tag_names": ["shape"]},
+                       headers=headers)
+    assert post.headers["content-type"] == "application/json"
+    post_id = PostResponse.model_validate(post.json()).id
+    client.post(f"/posts/{post_id}/comments", json={"content": "first"}, headers=headers)
+    client.post(f"/posts/{post_id}/like", headers=fan_headers)
+    notification_queue.flush()
+
+    for url, model in ((f"/posts?author={username}", List[PostResponse]), (f"/posts/{post_id}", PostResponse),
+                       ("/posts/search?q=shaped", List[PostSearchResult]), ("/users/me", UserResponse),
+                       (f"/posts/{post_id}/comments", List[CommentResponse]), ("/tags", List[TagResponse]),
+                       ("/notifications", List[NotificationResponse])):
+        body = client.get(url, headers=headers).json()
+        assert body, url
+        # Every field of the model is present, none extra
+        assert TypeAdapter(model).dump_python(TypeAdapter(model).validate_python(body), mode="json") == body, url
+    posts = client.get(f"/posts?author={username}", headers=headers).json()
+    assert posts[0]["author"]["posts_count"] == 1 and posts[0]["tags"][0]["name"] == "shape"
+    # Defaults such as tags=[] are copied per row, never shared
+    class Tagged(BaseModel):
+        tags: List[str] = []
+
+    first, second = Fields(Tagged)(object()), Fields(Tagged)(object())
+    assert first["tags"] == [] and first["tags"] is not second["tags"]
+
+def test_summary_view_skips_post_bodies():
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import make_excerpt
+
+    username, headers = make_user("summary")
+    body = "## Intro\n\nSome **bold** words and a [link](https://example.com).\n\n" + "more text " * 200
+    client.post("/posts", json={"title": "Summarised", "content": body, "tag_names": ["brief"]}, headers=headers)
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        summary = client.get(f"/posts?author={username}&view=summary", headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    post = summary.json()[0]
+    assert post["excerpt"].startswith("Intro Some bold words and a link. more text") and post["excerpt"].endswith("…")
+    assert "content" not in post and set(post["author"]) == {"id", "username", "full_name", "avatar_url"}
+    assert post["tags"][0]["name"] == "brief"
+    assert not any("posts.content" in statement for statement in statements)
+    assert make_excerpt("Set `max_page_size` in *some_var_name*, not 2*3_x.") == \
+        "Set max_page_size in some_var_name, not 2*3_x."
+    full = client.get(f"/posts?author={username}", headers=headers)
+    assert len(summary.content) * 5 < len(full.content)
+
+    response = client.get("/feed?fields=id,title,is_liked_by_user", headers=headers)
+    assert response.json()[0] == {"id": post["id"], "title": "Summarised", "is_liked_by_user": False}
+    assert client.get("/posts?fields=id,password").status_code == 400
+    assert client.get("/posts?view=tiny").status_code == 400
+
+def test_long_listings_stream_and_compress():
+    import asyncio
+    import gzip
+    import json
+    from app import SessionLocal, Comment, User
+    from compression import CompressionMiddleware
+
+    username, headers = make_user("streamer")
+    post_id = client.post("/posts", json={"title": "Busy thread", "content": "body"}, headers=headers).json()["id"]
+    db = SessionLocal()
+    author_id = db.query(User.id).filter(User.username == username).scalar()
+    db.add_all(Comment(content=f"comment {i}", post_id=post_id, author_id=author_id) for i in range(1200))
+    db.commit()
+    db.close()
+
+    paged, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/posts/{post_id}/comments?limit=100&cursor={cursor}")
+        paged.extend(page.json())
+        cursor = page.headers.get("X-Next-Cursor")
+    with client.stream("GET", f"/posts/{post_id}/comments?stream=true",
+                       headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert json.loads(gzip.decompress(raw)) == paged
+    assert len(client.get(f"/posts/{post_id}/comments?stream=true&limit=10").json()) == 10
+
+    # Responses in one piece are compressed only above the size threshold
+    big = client.get(f"/posts/{post_id}/comments?limit=100", headers={"Accept-Encoding": "gzip"})
+    assert big.headers["content-encoding"] == "gzip" and "Accept-Encoding" in big.headers["vary"]
+    small = client.get(f"/posts/{post_id}/comments?limit=1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in client.get("/tags", headers={"Accept-Encoding": "identity"}).headers
+
+    # Server-sent events pass through untouched
+    async def events(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream")]})
+        await send({"type": "http.response.body", "body": b"data: x\n\n" * 500, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    sent = []
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip, br")]}
+    asyncio.run(CompressionMiddleware(events)(scope, None, send))
+    assert sent[1]["body"].startswith(b"data: x")
+
+@pytest.mark.parametrize("vectorized", [True, False], ids=["numpy", "python"])
+def test_trending_ranks_by_decayed_engagement(monkeypatch, vectorized):
+    from datetime import datetime, timedelta
+    import ranking
+    from app import SessionLocal, Post, User, trending
+
+    numpy = ranking.numpy
+    assert numpy is not None, "numpy is in requirements.txt"
+    if not vectorized:
+        monkeypatch.setattr(ranking, "numpy", None)
+    trending.rebuild()
+
+    username, headers = make_user("trendy")
+    _, fan_headers = make_user("trend_fan")
+    ids = [client.post("/posts", json={"title": f"Trend {i}", "content": "body"}, headers=headers).json()["id"]
+           for i in range(3)]
+    db = SessionLocal()
+    author_id = db.query(User.id).filter(User.username == username).scalar()
+    # Twenty likes three days ago have decayed below a fresh post's; ten days is outside the window
+    old = Post(title="Old news", content="body", author_id=author_id, likes_count=20,
+               created_at=datetime.utcnow() - timedelta(days=3))
+    ancient = Post(title="Ancient", content="body", author_id=author_id, likes_count=500,
+                   created_at=datetime.utcnow() - timedelta(days=10))
+    db.add_all([old, ancient])
+    db.commit()
+    trending.touch([old.id, ancient.id])
+    db.close()
+    trending.refresh()
+
+    client.post(f"/posts/{ids[2]}/like", headers=fan_headers)
+    client.post(f"/posts/{ids[1]}/comments", json={"content": "hot take"}, headers=fan_headers)
+    trending.refresh()
+
+    ranked = trending.page(0, 10 ** 6)
+    mine = [post_id for post_id in ranked if post_id in ids + [old.id, ancient.id]]
+    assert mine == [ids[1], ids[2], ids[0], old.id]
+    page = client.get(f"/posts/trending?offset={ranked.index(ids[2])}&limit=1").json()
+    assert page[0]["id"] == ids[2] and page[0]["likes_count"] == 1
+    assert client.get("/metrics").json()["trending"]["ranked_posts"] == len(ranked)
+    assert client.get("/metrics").json()["trending"]["numpy"] is vectorized
+    for params in ("limit=0", "limit=-1", "offset=-1"):
+        assert client.get(f"/posts/trending?{params}").status_code == 422
+
+    # The other scoring path ranks the same posts in the same order
+    rows = [row for batch in trending._load_rows(None) for row in batch]
+    scores = trending.score(rows)
+    monkeypatch.setattr(ranking, "numpy", None if vectorized else numpy)
+    assert trending.score(rows) == pytest.approx(scores, rel=1e-12)
+    trending.rebuild()
+    assert trending.page(0, 10 ** 6) == ranked
+
+def test_tag_stats_are_served_from_memory():
+    from uuid import uuid4
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    _, headers = make_user("tagger")
+    suffix = uuid4().hex[:6]
+    common, often, rare = f"common{suffix}", f"often{suffix}", f"rare{suffix}"
+    for names in ([common, often], [common, often], [common, rare], [common]):
+        client.post("/posts", json={"title": "Tagged", "content": "body", "tag_names": names}, headers=headers)
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    client.get("/tags", headers=headers)
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        tags = client.get("/tags", headers=headers).json()
+        related = client.get(f"/tags/{common}/related", headers=headers).json()
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert statements == []
+
+    counts = [tag["posts_count"] for tag in tags]
+    assert counts == sorted(counts, reverse=True)
+    mine = {tag["name"]: tag["posts_count"] for tag in tags if tag["name"].endswith(suffix)}
+    assert mine == {common: 4, often: 2, rare: 1}
+    assert [(tag["name"], tag["co_occurrences"], tag["similarity"]) for tag in related] == [
+        (often, 2, 0.5), (rare, 1, 0.25)
+    ]
+    assert client.get(f"/tags/{often}/related?limit=1").json()[0]["name"] == common
+    assert client.get("/tags/no-such-tag/related").status_code == 404
+    for url in ("/tags?limit=0", f"/tags/{common}/related?limit=0", f"/tags/{common}/related?limit=-1"):
+        assert client.get(url, headers=headers).status_code == 422
+
+
+def test_tag_stats_keep_posts_added_during_a_rebuild():
+    from tag_stats import TagStats
+
+    tags = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+    rows = [(1, 1), (1, 2)]
+
+    def load():
+        # Post 2 commits before the rows are read, post 3 after; both report while loading
+        rows.append((2, 1))
+        stats.add_tags([{"id": 3, "name": "c"}])
+        stats.add_post(2, [1])
+        stats.add_post(3, [1, 3])
+        return list(tags), list(rows)
+
+    stats = TagStats(load)
+    stats.rebuild()
+    assert [(tag["name"], tag["posts_count"]) for tag in stats.popular()] == [("a", 3), ("b", 1), ("c", 1)]
+    assert [tag["name"] for tag in stats.related("c")] == ["a"]
@@ -30,4 +30,279 @@ def test_login_user():
     })
     assert response.status_code == 200
     data = response.json()
-    assert "access_token" in data 
\ No newline at end of file
+    assert "access_token" in data 
+
+
+def test_follow_counters():
+    from test_post import make_user
+
+    followed, _ = make_user("followed")
+    follower, follower_headers = make_user("follower")
+    assert client.post(f"/users/{followed}/follow", headers=follower_headers).status_code == 200
+    assert client.get(f"/users/{followed}").json()["followers_count"] == 1
+    assert client.get("/users/me", headers=follower_headers).json()["following_count"] == 1
+
+    client.delete(f"/users/{followed}/follow", headers=follower_headers)
+    assert client.get(f"/users/{followed}").json()["followers_count"] == 0
+
+def test_password_hasher_rehashes_deprecated_hashes():
+    import asyncio
+    from passlib.context import CryptContext
+    from passwords import PasswordHasher
+
+    context = CryptContext(schemes=["bcrypt", "md5_crypt"], deprecated="auto")
+    hasher = PasswordHasher(context, workers=1)
+    legacy = context.handler("md5_crypt").hash("secret")
+    valid, new_hash = asyncio.run(hasher.verify_and_update("secret", legacy))
+    assert valid and new_hash.startswith("$2b$")
+    assert asyncio.run(hasher.verify_and_update("secret", new_hash)) == (True, None)
+    assert hasher.metrics()["rehashed"] == 1
+    hasher.shutdown()
+
+def test_password_hasher_sheds_load_when_backlog_is_full():
+    import asyncio
+    from passlib.context import CryptContext
+    from passwords import HasherOverloaded, PasswordHasher
+
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"]), workers=1, max_queue=1)
+
+    async def burst():
+        return await asyncio.gather(*(hasher.hash("secret") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, HasherOverloaded) for result in results) == 1
+    assert hasher.metrics()["rejected"] == 1
+    hasher.shutdown()
+
+
+def test_authenticated_user_is_cached_until_changed():
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import user_cache
+    from test_post import make_user
+
+    username, headers = make_user("cached")
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    assert client.get("/users/me", headers=headers).status_code == 200
+    hits = user_cache.stats()["hits"]
+    event.listen(Engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/users/me", headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+    assert user_cache.stats()["hits"] == hits + 1
+    assert not [s for s in statements if "FROM users" in s]
+
+    # Profile edits are visible on the next request
+    assert client.put("/users/me", json={"bio": "updated"}, headers=headers).status_code == 200
+    assert client.get("/users/me", headers=headers).json()["bio"] == "updated"
+
+    # A deactivated account is rejected even though its token is still valid
+    assert client.delete("/users/me", headers=headers).status_code == 200
+    assert client.get("/users/me", headers=headers).status_code == 400
+
+
+def test_verified_tokens_are_cached_and_fail_closed(monkeypatch):
+    import app
+    from test_post import make_user
+
+    username, headers = make_user("token")
+    app.token_cache.clear()
+    assert client.get("/users/me", headers=headers).status_code == 200
+    hits = app.token_cache.stats()["hits"]
+    assert client.get("/users/me", headers=headers).status_code == 200
+    assert app.token_cache.stats()["hits"] == hits + 1
+
+    # A forged signature never matches the cached entry
+    token = headers["Authorization"].split()[1]
+    forged = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    assert client.get("/users/me", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+
+    # Rotating the signing key invalidates tokens that were already cached
+    monkeypatch.setattr(app, "SECRET_KEY", "rotated-secret-key-for-the-signing-test")
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+
+def test_home_feed_merges_fanned_out_and_celebrity_posts(monkeypatch):
+    import app
+    from test_post import make_user
+
+    author, author_headers = make_user("author")
+    reader, reader_headers = make_user("reader")
+    client.post(f"/users/{author}/follow", headers=reader_headers)
+
+    def publish(title, headers):
+        return client.post("/posts", json={"title": title, "content": "body"}, headers=headers).json()["id"]
+
+    fanned_out = [publish(f"fanned {i}", author_headers) for i in range(3)]
+    # Once the author counts as a celebrity their posts are pulled at read time
+    monkeypatch.setattr(app, "CELEBRITY_FOLLOWER_THRESHOLD", 1)
+    pulled = publish("pulled", author_headers)
+    own = publish("own", reader_headers)
+
+    db = app.SessionLocal()
+    stored = {post_id for (post_id,) in db.query(app.TimelineEntry.post_id).filter(
+        app.TimelineEntry.user_id == app.load_user(db, reader).id)}
+    db.close()
+    assert stored == set(fanned_out)
+
+    seen, cursor = [], None
+    while True:
+        page = client.get("/feed", params={"limit": 2, "cursor": cursor}, headers=reader_headers)
+        seen += [post["id"] for post in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == sorted(fanned_out + [pulled, own], reverse=True)
+
+    client.delete(f"/users/{author}/follow", headers=reader_headers)
+    assert [post["id"] for post in client.get("/feed", headers=reader_headers).json()] == [own]
+
+    for limit in (0, -1):
+        assert client.get("/feed", params={"limit": limit}, headers=reader_headers).status_code == 422
+
+
+def test_upgrade_backfills_timelines_of_existing_follows():
+    import app
+    from test_post import make_user
+
+    author, author_headers = make_user("oldauthor")
+    reader, reader_headers = make_user("oldreader")
+    client.post(f"/users/{author}/follow", headers=reader_headers)
+    post_id = client.post("/posts", json={"title": "Before timelines", "content": "body"},
+                          headers=author_headers).json()["id"]
+
+    # A database from before timeline_entries existed: no rows, version 4
+    db = app.SessionLocal()
+    reader_id = app.load_user(db, reader).id
+    db.query(app.TimelineEntry).filter(app.TimelineEntry.user_id == reader_id).delete()
+    db.execute(app.migrator.version_table.delete().where(app.migrator.version_table.c.version >= 5))
+    db.commit()
+    db.close()
+
+    assert [migration.version for migration in app.migrator.upgrade()] == [5]
+    assert [post["id"] for post in client.get("/feed", headers=reader_headers).json()] == [post_id]
+
+
+def test_rebuilt_timelines_keep_each_follows_newest_posts(monkeypatch):
+    import app
+    from test_post import make_user
+
+    author, author_headers = make_user("prolific")
+    readers = [make_user(f"backlog{i}") for i in range(3)]
+    for _, headers in readers:
+        client.post(f"/users/{author}/follow", headers=headers)
+    post_ids = [client.post("/posts", json={"title": f"Post {i}", "content": "body"}, headers=author_headers)
+                .json()["id"] for i in range(4)]
+
+    monkeypatch.setattr(app, "TIMELINE_BACKFILL_POSTS", 2)
+    db = app.SessionLocal()
+    reader_ids = [app.load_user(db, username).id for username, _ in readers]
+    entries = app.TimelineEntry
+    db.query(entries).filter(entries.user_id.in_(reader_ids)).delete()
+    db.commit()
+    app.rebuild_timelines(db, batch_size=1)
+    for reader_id in reader_ids:
+        stored = {post_id for (post_id,) in db.query(entries.post_id).filter(entries.user_id == reader_id)}
+        assert stored == set(post_ids[-2:])
+    db.close()
+
+
+def test_notifications_are_coalesced_and_written_in_the_background():
+    from app import notification_queue
+    from test_post import make_user
+
+    author, author_headers = make_user("popular")
+    post_id = client.post("/posts", json={"title": "Hot take", "content": "body"},
+                          headers=author_headers).json()["id"]
+    fans = [make_user(f"fan{i}") for i in range(3)]
+    for _, headers in fans:
+        client.post(f"/posts/{post_id}/like", headers=headers)
+    client.post(f"/users/{author}/follow", headers=fans[0][1])
+    # Liking your own post does not notify you
+    client.post(f"/posts/{post_id}/like", headers=author_headers)
+
+    # Nothing is written until the pipeline drains
+    assert client.get("/notifications", headers=author_headers).json() == []
+    notification_queue.flush()
+
+    notifications = {n["type"]: n for n in client.get("/notifications", headers=author_headers).json()}
+    assert set(notifications) == {"like", "follow"}
+    assert notifications["like"]["message"] == f'{fans[-1][0]} and 2 others liked your post "Hot take"'
+    assert notifications["follow"]["message"] == f"{fans[0][0]} started following you"
+
+
+def test_bulk_mark_read_unread_count_and_prune():
+    from datetime import datetime, timedelta
+    from app import SessionLocal, Notification, load_user, prune_read_notifications, write_notifications
+    from test_post import make_user
+
+    username, headers = make_user("inbox")
+    db = SessionLocal()
+    user_id = load_user(db, username).id
+    write_notifications([{"user_id": user_id, "type": "like", "title": "New like", "message": f"like {i}",
+                          "is_read": False} for i in range(6)])
+    ids = sorted(id for (id,) in db.query(Notification.id).filter(Notification.user_id == user_id))
+
+    def unread():
+        return client.get("/notifications/unread-count", headers=headers).json()["unread"]
+
+    assert unread() == 6
+    assert client.put("/notifications/read", json={"ids": ids[:2]}, headers=headers).json() == {"updated": 2}
+    assert client.put("/notifications/read", json={"up_to_id": ids[3]}, headers=headers).json() == {"updated": 2}
+    assert unread() == 2
+    assert client.put("/notifications/read", json={}, headers=headers).json() == {"updated": 2}
+    assert unread() == 0
+
+    # Only read notifications past the cutoff are pruned, in batches
+    assert prune_read_notifications(db, datetime.utcnow() - timedelta(days=1)) == 0
+    assert prune_read_notifications(db, datetime.utcnow() + timedelta(days=1), batch_size=4) >= 6
+    assert db.query(Notification).filter(Notification.user_id == user_id).count() == 0
+    db.close()
+
+
+def test_notifications_are_pushed_to_connected_streams(monkeypatch):
+    import app
+    from test_post import make_user
+
+    author, author_headers = make_user("streamer")
+    _, fan_headers = make_user("streamfan")
+    post_id = client.post("/posts", json={"title": "Live", "content": "body"}, headers=author_headers).json()["id"]
+    token = author_headers["Authorization"].split()[1]
+    monkeypatch.setattr(app, "STREAM_HEARTBEAT_SECONDS", 0.05)
+
+    with client.websocket_connect(f"/notifications/ws?token={token}") as websocket:
+        assert websocket.receive_json() == {"event": "ping"}
+        client.post(f"/posts/{post_id}/like", headers=fan_headers)
+        app.notification_queue.flush()
+        while (message := websocket.receive_json())["event"] == "ping":
+            pass
+        assert message["event"] == "notification"
+        assert message["data"]["type"] == "like"
+        assert message["data"]["id"] == client.get("/notifications", headers=author_headers).json()[0]["id"]
+
+    assert client.get("/notifications/stream").status_code == 401
+
+
+def test_slow_stream_subscribers_are_cut_off():
+    import asyncio
+    from broker import Broker
+
+    async def scenario():
+        broker = Broker(queue_size=2)
+        slow = broker.subscribe(1)
+        for i in range(3):
+            broker.publish(1, f"message {i}")
+        await asyncio.sleep(0)
+        received = [await slow.next(timeout=0.1) for _ in range(2)]
+        return slow.overflowed, received, broker.metrics()["overflowed"]
+
+    overflowed, received, count = asyncio.run(scenario())
+    assert overflowed and count == 1
+    # The oldest message makes room for the marker that tells the reader to resync
+    assert received == ["message 1", None]
@@ -0,0 +1,79 @@
+"""
+Write-behind buffer for post view counts.
+
+Reads record views in memory; a background thread hands the accumulated
+increments to a flush callback every ``interval`` seconds so that serving a
+post never needs a write transaction.
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    def __init__(self, flush: Callable[[Dict[int, int]], None], interval: float = 5.0):
+        self._flush = flush
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Counter = Counter()
+        # Views handed to the flush callback but not yet committed
+        self._flushing: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, post_ids: Iterable[int]):
+        with self._lock:
+            self._pending.update(post_ids)
+
+    def pending(self, post_id: Optional[int] = None) -> int:
+        """Views not yet written to the database, for one post or in total."""
+        with self._lock:
+            if post_id is None:
+                return sum(self._pending.values()) + sum(self._flushing.values())
+            return self._pending[post_id] + self._flushing[post_id]
+
+    def flush(self) -> int:
+        """Write buffered views through the flush callback; returns the view total."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, Counter()
+            self._flushing.update(batch)
+        try:
+            self._flush(dict(batch))
+        except Exception:
+            # Keep the views so the next flush retries them
+            with self._lock:
+                self._pending.update(batch)
+            raise
+        finally:
+            with self._lock:
+                self._flushing.subtract(batch)
+                self._flushing = +self._flushing
+        return sum(batch.values())
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write whatever is still buffered."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush view counts; will retry")